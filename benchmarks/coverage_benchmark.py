@@ -0,0 +1,168 @@
+# –––––––––– Headless coverage throughput benchmark across networks, swarm sizes and strategies ––––––––––
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'simulation'))
+from network import compile_inp
+from profiler import Profiler
+from simulation_manager import SimulationManager
+from experiment import STRATEGIES
+
+NETWORK_DIRECTORIES = ("../networks/test_space/", "../networks/wntr_examples/")
+
+# Metrics checked against the baseline, and whether a higher value is better
+REGRESSION_METRICS = {
+    'ticks_per_second': True,
+    'robot_steps_per_second': True,
+    'peak_rss_mb': False,
+    'network_build_seconds': False,
+}
+
+# Timings shorter than these are too noisy to compare even at their best repeat, so such cases are skipped
+MIN_COMPARED_RUN_SECONDS = 0.5
+MIN_COMPARED_BUILD_SECONDS = 0.05
+
+def network_files():
+    ''' Returns every INP file in the benchmarked network directories. '''
+    files = []
+    for directory_path in NETWORK_DIRECTORIES:
+        files += glob.glob(os.path.join(directory_path, '*.inp')) + glob.glob(os.path.join(directory_path, '*.INP'))
+    return sorted(files)
+
+def peak_rss_mb():
+    ''' Returns the peak resident set size of this process in MB. '''
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in KB elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_case(case):
+    ''' Runs one benchmark case in a fresh process and returns its measurements.
+
+    The network build and the simulation are each repeated and timed, and the fastest repeat is kept, since
+    noise from the rest of the machine only ever adds time. Every repeat uses the same seed, so all of them
+    run the same ticks.
+    '''
+    build_times = []
+    for _ in range(case['repeats']):
+        start_time = time.perf_counter()
+        compile_inp(case['network_file'])
+        build_times.append(time.perf_counter() - start_time)
+
+    wall_times = []
+    for _ in range(case['repeats']):
+        profiler = Profiler() if case['profile'] else None
+        simulation = SimulationManager(
+            case['network_file'], case['number_of_robots'], STRATEGIES[case['strategy']],
+            max_ticks=case['max_ticks'], seed=case['seed'], profiler=profiler,
+        )
+        start_time = time.perf_counter()
+        simulation.run()
+        wall_times.append(time.perf_counter() - start_time)
+    wall_time = min(wall_times)
+
+    covered = simulation.is_covered()
+    measurement = {
+        'network': os.path.basename(case['network_file']),
+        'strategy': case['strategy'],
+        'number_of_robots': case['number_of_robots'],
+        'ticks': simulation.tick,
+        'covered': covered,
+        'coverage_fraction': simulation.covered_count / simulation.network.number_of_nodes,
+        'wall_time': wall_time,
+        'median_wall_time': float(np.median(wall_times)),
+        'wall_times': wall_times,
+        'time_to_coverage': wall_time if covered else None,
+        'ticks_per_second': simulation.tick / wall_time,
+        'robot_steps_per_second': simulation.tick * case['number_of_robots'] / wall_time,
+        'microseconds_per_robot_step': wall_time * 1e6 / max(simulation.tick * case['number_of_robots'], 1),
+        'network_build_seconds': min(build_times),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    if profiler is not None:
+        measurement['profile'] = profiler.summary()
+    return measurement
+
+def find_regressions(results, baseline, threshold):
+    ''' Compares results with a baseline, returning a description of every metric worse by more than the threshold. '''
+    baseline_cases = {(case['network'], case['strategy'], case['number_of_robots']): case for case in baseline['cases']}
+    regressions = []
+    for case in results['cases']:
+        key = (case['network'], case['strategy'], case['number_of_robots'])
+        if key not in baseline_cases:
+            continue
+        for metric, higher_is_better in REGRESSION_METRICS.items():
+            old, new = baseline_cases[key][metric], case[metric]
+            if not old:
+                continue
+            if metric.endswith('per_second') and baseline_cases[key]['wall_time'] < MIN_COMPARED_RUN_SECONDS:
+                continue
+            if metric == 'network_build_seconds' and old < MIN_COMPARED_BUILD_SECONDS:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -threshold) or (not higher_is_better and change > threshold):
+                regressions.append(f"{key[0]} / {key[1]} / {key[2]} robots: {metric} {old:.4g} -> {new:.4g} ({change:+.1%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks coverage throughput and checks for regressions.')
+    parser.add_argument('--robots', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--strategies', nargs='+', default=list(STRATEGIES))
+    parser.add_argument('--max-ticks', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=5, help='timed runs per case, of which the fastest is kept')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--profile', action='store_true', help='record the time spent in each phase (slows the run)')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to check for regressions against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative change that counts as a regression')
+    args = parser.parse_args()
+
+    cases = [
+        {'network_file': network_file, 'strategy': strategy, 'number_of_robots': number_of_robots,
+         'max_ticks': args.max_ticks, 'seed': args.seed, 'repeats': args.repeats, 'profile': args.profile}
+        for network_file in network_files() for strategy in args.strategies for number_of_robots in args.robots
+    ]
+
+    # One case per process, one process at a time, so peak memory and timings are not shared between cases
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        measurements = []
+        for measurement in pool.imap(run_case, cases):
+            measurements.append(measurement)
+            print(f"{measurement['network']:<20} | {measurement['strategy']:<22} | {measurement['number_of_robots']:>5} robots | "
+                  f"{measurement['ticks_per_second']:>10.0f} ticks/s | {measurement['peak_rss_mb']:>7.1f} MB | "
+                  f"{'covered' if measurement['covered'] else 'not covered'}")
+
+    results = {
+        'metadata': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'max_ticks': args.max_ticks,
+            'seed': args.seed,
+            'repeats': args.repeats,
+        },
+        'cases': measurements,
+    }
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = find_regressions(results, json.load(baseline_file), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# –––––––––– Benchmarks the streaming INP parser against wntr and checks they agree on topology ––––––––––
+
+import glob
+import os
+import sys
+import time
+import numpy as np
+import wntr
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'simulation'))
+from inp_parser import parse_inp
+
+def read_with_wntr(inp_file_path):
+    ''' Reads the same topology as parse_inp using wntr's full water network model. '''
+    wn = wntr.network.WaterNetworkModel(inp_file_path)
+    links = {}
+    for link_name, link in wn.links():
+        length = link.length if link.link_type == 'Pipe' else 0.0
+        links[link_name] = (link.start_node_name, link.end_node_name, length)
+    coordinates = {name: wn.get_node(name).coordinates for name in wn.node_name_list}
+    return wn.node_name_list, coordinates, links
+
+def compare(parsed, node_names, coordinates, links):
+    ''' Returns a list of differences between the parsed network and wntr's view of it. '''
+    problems = []
+    if sorted(parsed['node_names']) != sorted(node_names):
+        problems.append('node sets differ')
+    for name, position in zip(parsed['node_names'], parsed['coordinates'].tolist()):
+        if name in coordinates and not np.allclose(position, coordinates[name]):
+            problems.append(f'coordinates of node {name} differ')
+            break
+    parsed_links = {}
+    for i, name in enumerate(parsed['link_names']):
+        start = parsed['node_names'][parsed['link_starts'][i]]
+        end = parsed['node_names'][parsed['link_ends'][i]]
+        parsed_links[name] = (start, end, parsed['link_lengths'][i])
+    if parsed_links.keys() != links.keys():
+        problems.append('link sets differ')
+    for name, (start, end, length) in links.items():
+        if name not in parsed_links:
+            continue
+        parsed_start, parsed_end, parsed_length = parsed_links[name]
+        if (parsed_start, parsed_end) != (start, end):
+            problems.append(f'endpoints of link {name} differ')
+            break
+        if not np.isclose(parsed_length, length):
+            problems.append(f'length of link {name} differs')
+            break
+    return problems
+
+def main():
+    directory_path = "../networks/"
+    inp_file_paths = sorted(glob.glob(os.path.join(directory_path, '*', '*.inp')) + glob.glob(os.path.join(directory_path, '*', '*.INP')))
+    all_agree = True
+
+    print('-' * 84)
+    print(f"{'File Name':<20} | {'Nodes':<8} | {'Links':<8} | {'wntr (ms)':<10} | {'Parser (ms)':<11} | {'Speedup':<8} | {'Agrees':<6}")
+    print('-' * 84)
+    for inp_file_path in inp_file_paths:
+        start_time = time.perf_counter()
+        node_names, coordinates, links = read_with_wntr(inp_file_path)
+        wntr_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        parsed = parse_inp(inp_file_path)
+        parser_time = time.perf_counter() - start_time
+
+        problems = compare(parsed, node_names, coordinates, links)
+        all_agree = all_agree and not problems
+        print(f"{os.path.basename(inp_file_path):<20} | {len(node_names):<8} | {len(links):<8} | {wntr_time * 1000:<10.1f} | {parser_time * 1000:<11.1f} | {wntr_time / parser_time:<8.1f} | {'yes' if not problems else 'no':<6}")
+        for problem in problems:
+            print(f"    {problem}")
+    print('-' * 84)
+
+    if not all_agree:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
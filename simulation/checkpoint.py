@@ -0,0 +1,82 @@
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Bumped whenever the layout of saved states changes, so old checkpoints are refused rather than misread
+CHECKPOINT_FORMAT_VERSION = 2
+
+def save_checkpoint(path, checkpoint):
+    ''' Writes a checkpoint atomically: to a temporary file first, flushed to disk, then renamed over the old one. '''
+    staging = path + '.tmp'
+    with open(staging, 'wb') as checkpoint_file:
+        pickle.dump(checkpoint, checkpoint_file, protocol=pickle.HIGHEST_PROTOCOL)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(staging, path)
+
+def load_checkpoint(path):
+    ''' Reads a checkpoint written by save_checkpoint. Only load checkpoints from trusted sources. '''
+    with open(path, 'rb') as checkpoint_file:
+        checkpoint = pickle.load(checkpoint_file)
+    if checkpoint.get('version') != CHECKPOINT_FORMAT_VERSION:
+        raise ValueError(f"{path} was written by an incompatible version of the simulation")
+    return checkpoint
+
+def resume_simulation(path, **overrides):
+    ''' Rebuilds a simulation from a checkpoint, so that running it continues exactly where the checkpoint left it.
+
+    Keyword arguments override the simulation's original constructor arguments, e.g. to raise max_ticks.
+    Observers are not part of the state and have to be attached again.
+    '''
+    checkpoint = load_checkpoint(path)
+    simulation = checkpoint['engine'](**dict(checkpoint['config'], **overrides))
+    simulation.set_state(checkpoint['state'])
+    return simulation
+
+class Checkpointer:
+    ''' Observer that periodically saves the full state of a simulation, including its random number generators.
+
+    The state is copied at the end of a tick, then pickled and written on a background thread, so the run
+    only pauses for the copy. A checkpoint that is due while the previous one is still being written waits
+    for it, so at most one write is ever in flight. Checkpoints are taken every given number of ticks, every
+    given number of seconds of wall time, or both, and once more when the run finishes.
+    '''
+    def __init__(self, path, every=None, interval=None):
+        ''' Checkpointer object constructor. '''
+        self.path = path
+        self.every = every
+        self.interval = interval
+
+    def on_start(self, simulation):
+        ''' Starts the background writer. '''
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+        self.last_saved = time.monotonic()
+
+    def on_tick(self, simulation):
+        ''' Takes a checkpoint if one is due. '''
+        if (self.every and simulation.tick % self.every == 0) or \
+                (self.interval and time.monotonic() - self.last_saved >= self.interval):
+            self.checkpoint(simulation)
+        return True
+
+    def on_finish(self, simulation):
+        ''' Takes a final checkpoint and waits for it to be written. '''
+        self.checkpoint(simulation)
+        self.pending.result()
+        self.executor.shutdown()
+
+    def checkpoint(self, simulation):
+        ''' Copies the simulation's state and hands it to the background writer. '''
+        checkpoint = {
+            'version': CHECKPOINT_FORMAT_VERSION,
+            'engine': type(simulation),
+            'config': simulation.config,
+            'state': simulation.get_state(),
+        }
+        # Raises any error from the previous write
+        if self.pending is not None:
+            self.pending.result()
+        self.pending = self.executor.submit(save_checkpoint, self.path, checkpoint)
+        self.last_saved = time.monotonic()
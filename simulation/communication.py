@@ -0,0 +1,19 @@
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+def communication_pairs(coordinates, communication_range):
+    ''' Returns index pairs of points within communication range, found with a k-d tree. '''
+    pairs = cKDTree(coordinates).query_pairs(communication_range, output_type='ndarray')
+    return pairs[:, 0], pairs[:, 1]
+
+def communication_components(coordinates, communication_range):
+    ''' Labels each point with its connected component in the communication graph. '''
+    number_of_points = len(coordinates)
+    if communication_range <= 0 or number_of_points == 0:
+        return np.arange(number_of_points)
+    first, second = communication_pairs(coordinates, communication_range)
+    graph = coo_matrix((np.ones(len(first), dtype=np.int8), (first, second)), shape=(number_of_points, number_of_points))
+    _, labels = connected_components(graph, directed=False)
+    return labels
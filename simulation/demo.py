@@ -0,0 +1,12 @@
+from simulation_manager import SimulationManager
+from inspection_strategy import AntColonyOptimisation
+from renderer import PygameRenderer
+
+def main():
+    ''' Runs a single simulation with the live pygame view attached. '''
+    simulation = SimulationManager("../networks/wntr_examples/Net3.inp", 10, AntColonyOptimisation)
+    simulation.add_observer(PygameRenderer(ticks_per_second=20), every=1)
+    simulation.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import heapq
+import math
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+from network import network_graph, ZERO_LENGTH_WEIGHT
+
+class NearestSourceField:
+    ''' Shortest distance from every node to its nearest source node, with the next hop towards it.
+
+    The field starts from one multi-source Dijkstra over the whole network. Removing sources only lengthens
+    distances inside the removed sources' own regions, since every other node keeps its nearest source. So a
+    removal clears just those regions and repairs them with a Dijkstra seeded from their boundary, and the cost
+    follows the size of the regions rather than the network.
+    '''
+    def __init__(self, network, sources):
+        ''' Nearest source field object constructor. '''
+        self.neighbors = network.split_rows(network.neighbors)
+        self.weights = network.split_rows(np.maximum(network.lengths, ZERO_LENGTH_WEIGHT))
+        self.is_source = np.zeros(network.number_of_nodes, dtype=bool)
+        self.is_source[sources] = True
+        self.is_source = self.is_source.tolist()
+        if len(sources):
+            distances, predecessors, nearest = dijkstra(
+                network_graph(network), indices=sources, min_only=True, return_predecessors=True
+            )
+        else:
+            distances = np.full(network.number_of_nodes, np.inf)
+            predecessors = nearest = np.full(network.number_of_nodes, -1)
+        # Lists, since the repairs read and write single entries
+        self.distances = distances.tolist()
+        # scipy marks missing predecessors and sources with negative values
+        self.next_hops = np.maximum(predecessors, -1).tolist()
+        self.nearest = np.maximum(nearest, -1).tolist()
+
+    def path(self, node):
+        ''' Returns the nodes on the shortest path from a node to its nearest source, or [] if none is reachable. '''
+        path = []
+        if self.nearest[node] < 0:
+            return path
+        while self.next_hops[node] >= 0:
+            node = self.next_hops[node]
+            path.append(node)
+        return path
+
+    def remove_sources(self, sources):
+        ''' Stops the given nodes being sources, repairing the distances of the nodes that were nearest to them. '''
+        distances, next_hops, nearest = self.distances, self.next_hops, self.nearest
+        cleared = []
+        for source in sources:
+            if not self.is_source[source]:
+                continue
+            self.is_source[source] = False
+            # A source's region is connected through its shortest-path tree, so it is found from the source
+            stack = [source]
+            nearest[source] = -1
+            while stack:
+                node = stack.pop()
+                cleared.append(node)
+                distances[node] = math.inf
+                next_hops[node] = -1
+                for neighbor in self.neighbors[node]:
+                    if nearest[neighbor] == source:
+                        nearest[neighbor] = -1
+                        stack.append(neighbor)
+
+        # Cleared nodes are first reached from the intact nodes around them, then from each other
+        heap = []
+        for node in cleared:
+            for neighbor, weight in zip(self.neighbors[node], self.weights[node]):
+                if nearest[neighbor] >= 0 and distances[neighbor] + weight < distances[node]:
+                    distances[node] = distances[neighbor] + weight
+                    next_hops[node] = neighbor
+                    nearest[node] = nearest[neighbor]
+            if nearest[node] >= 0:
+                heap.append((distances[node], node))
+        heapq.heapify(heap)
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if distance > distances[node]:
+                continue
+            for neighbor, weight in zip(self.neighbors[node], self.weights[node]):
+                if distance + weight < distances[neighbor]:
+                    distances[neighbor] = distance + weight
+                    next_hops[neighbor] = node
+                    nearest[neighbor] = nearest[node]
+                    heapq.heappush(heap, (distance + weight, neighbor))
@@ -0,0 +1,114 @@
+import heapq
+import numpy as np
+from simulation_manager import SimulationManager
+
+# Below this many simultaneous arrivals, deciding robot by robot is cheaper than a vectorised batch
+BATCH_THRESHOLD = 32
+
+class EventSimulationManager(SimulationManager):
+    ''' Discrete-event engine where robots take length / speed to travel along a pipe.
+
+    Robots are kept in a priority queue of arrival times. Each step jumps the clock to the next arrival and only
+    asks the strategy for the robots that just reached a node, so the cost follows node arrivals rather than
+    ticks times robots. A tick here is one batch of simultaneous arrivals.
+    '''
+    def __init__(self, network_file, number_of_robots=1, speed=1.0, max_time=None, update_interval=None, **kwargs):
+        ''' Event simulation manager constructor; speed is in network length units (m) per second.
+
+        Strategy updates (pheromones, knowledge sharing) run at most once per update interval of simulated
+        time, which defaults to the median time to travel a pipe, i.e. about once per tick of the tick engine.
+        '''
+        super().__init__(network_file, number_of_robots, **kwargs)
+        self.config.update(speed=speed, max_time=max_time, update_interval=update_interval)
+        self.speed = speed
+        self.max_time = max_time
+        if update_interval is None:
+            update_interval = np.median(self.network.edge_lengths[self.network.edge_lengths > 0]) / speed
+        self.update_interval = update_interval
+        self.next_update = 0.0
+        self.time = 0.0
+        self.coverage_time = None
+        # The move a robot is travelling along is only applied when it arrives, so until then it stays at the
+        # node it departed from, both for communication and for its group's visited bitsets
+        self.pending_positions = np.zeros(number_of_robots, dtype=np.int64)
+        self.pending_distances = np.zeros(number_of_robots)
+        self.pending_edges = np.full(number_of_robots, -1, dtype=np.int64)
+        self.arrivals = [(0.0, robot_id) for robot_id in range(number_of_robots)]
+        heapq.heapify(self.arrivals)
+
+    def step(self):
+        ''' Advances the clock to the next arrival and lets every robot arriving then choose its next pipe. '''
+        manager = self.multi_robot_manager
+        previous_time = self.time
+        self.time, robot_id = heapq.heappop(self.arrivals)
+        robot_ids = [robot_id]
+        while self.arrivals and self.arrivals[0][0] == self.time:
+            robot_ids.append(heapq.heappop(self.arrivals)[1])
+        robot_ids = np.array(robot_ids)
+
+        arrived_edges = self.pending_edges[robot_ids]
+        manager.move_robots(
+            robot_ids, self.pending_positions[robot_ids], self.pending_distances[robot_ids], arrived_edges
+        )
+        self.pending_distances[robot_ids] = 0.0
+        self.pending_edges[robot_ids] = -1
+        self.mark_covered(manager.positions[robot_ids], arrived_edges[arrived_edges >= 0])
+        if self.is_covered():
+            self.coverage_time = self.time
+            self.tick += 1
+            return
+
+        if self.strategy.moves_in_batches and len(robot_ids) >= BATCH_THRESHOLD:
+            next_positions, distances, edge_ids = self.strategy.next_moves(manager, robot_ids)
+        else:
+            next_positions = np.empty(len(robot_ids), dtype=np.int64)
+            distances = np.zeros(len(robot_ids))
+            edge_ids = np.full(len(robot_ids), -1, dtype=np.int64)
+            for i, robot_id in enumerate(robot_ids.tolist()):
+                robot = manager.robots[robot_id]
+                next_position, distance, edge_id = self.strategy.next_move(robot, manager.robots, self.network)
+                if next_position is None:
+                    continue
+                next_positions[i], distances[i], edge_ids[i] = next_position, distance, edge_id
+
+        # Robots that cannot move are not rescheduled
+        for robot_id, next_position, distance, edge_id in zip(
+                robot_ids.tolist(), next_positions.tolist(), distances.tolist(), edge_ids.tolist()):
+            if edge_id >= 0:
+                self.pending_positions[robot_id] = next_position
+                self.pending_distances[robot_id] = distance
+                self.pending_edges[robot_id] = edge_id
+                heapq.heappush(self.arrivals, (self.time + distance / self.speed, robot_id))
+        # Zero-length links (pumps, valves) do not move the clock, so the strategy must still see those moves
+        if self.time >= self.next_update or self.time == previous_time:
+            self.strategy.update(manager)
+            self.next_update = self.time + self.update_interval
+        self.tick += 1
+
+    def get_state(self):
+        ''' Returns a copy of everything that changes during a run, including the clock and the arrival queue. '''
+        state = super().get_state()
+        state.update(
+            time=self.time, next_update=self.next_update, coverage_time=self.coverage_time,
+            pending_positions=self.pending_positions.copy(), pending_distances=self.pending_distances.copy(),
+            pending_edges=self.pending_edges.copy(),
+            arrivals=list(self.arrivals),
+        )
+        return state
+
+    def set_state(self, state):
+        ''' Restores state returned by get_state. '''
+        super().set_state(state)
+        self.time = state['time']
+        self.next_update = state['next_update']
+        self.coverage_time = state['coverage_time']
+        self.pending_positions[:] = state['pending_positions']
+        self.pending_distances[:] = state['pending_distances']
+        self.pending_edges[:] = state['pending_edges']
+        self.arrivals = list(state['arrivals'])
+
+    def is_finished(self):
+        ''' Returns whether the network is covered, no robot can move any more or the time limit has passed. '''
+        if self.is_covered() or not self.arrivals:
+            return True
+        return self.max_time is not None and self.arrivals[0][0] > self.max_time
@@ -0,0 +1,213 @@
+import csv
+import hashlib
+import inspect
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from scipy import stats
+from network_cache import network_key
+from simulation_manager import SimulationManager
+from event_simulation import EventSimulationManager
+from inspection_strategy import RandomWalkStrategy, AntColonyOptimisation, FrontierRouting
+
+STRATEGIES = {strategy.__name__: strategy for strategy in (RandomWalkStrategy, AntColonyOptimisation, FrontierRouting)}
+
+RESULT_FIELDS = [
+    'network', 'strategy', 'number_of_robots', 'seed', 'node_count',
+    'ticks', 'covered', 'distance_covered', 'coverage_time', 'wall_time',
+]
+
+# Bumped whenever a change to the engines or strategies changes results, so stale cached results are not reused
+RESULT_CACHE_FORMAT_VERSION = 4
+
+DEFAULT_RESULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'swarm_robotics_sim', 'results')
+
+def expand_configurations(network_files, strategy_names, robot_counts, max_ticks=None, speed=None, strategy_options=None):
+    ''' Expands the network x strategy x robot count grid into a list of configurations, i.e. jobs without a seed.
+
+    Giving a robot speed runs the jobs on the discrete-event engine, which also reports coverage time.
+    '''
+    return [
+        {
+            'network_file': network_file,
+            'strategy': strategy_name,
+            'number_of_robots': number_of_robots,
+            'max_ticks': max_ticks,
+            'speed': speed,
+            'strategy_options': strategy_options,
+        }
+        for network_file, strategy_name, number_of_robots in itertools.product(
+            network_files, strategy_names, robot_counts
+        )
+    ]
+
+def strategy_parameters(strategy_name, strategy_options=None):
+    ''' Returns the options a strategy is constructed with, its constructor defaults overridden by the given ones. '''
+    parameters = inspect.signature(STRATEGIES[strategy_name]).parameters
+    defaults = {
+        name: parameter.default for name, parameter in parameters.items()
+        if name not in ('network', 'rng') and parameter.default is not inspect.Parameter.empty
+    }
+    return dict(defaults, **(strategy_options or {}))
+
+def run_job(job):
+    ''' Runs a single seeded simulation and returns its result row. '''
+    start_time = time.perf_counter()
+    if job.get('speed'):
+        simulation = EventSimulationManager(
+            job['network_file'], job['number_of_robots'], speed=job['speed'],
+            strategy=STRATEGIES[job['strategy']], max_ticks=job['max_ticks'], seed=job['seed'],
+            strategy_options=job.get('strategy_options'),
+        )
+    else:
+        simulation = SimulationManager(
+            job['network_file'], job['number_of_robots'], STRATEGIES[job['strategy']],
+            max_ticks=job['max_ticks'], seed=job['seed'], strategy_options=job.get('strategy_options'),
+        )
+    simulation.run()
+    return {
+        'network': os.path.basename(job['network_file']),
+        'strategy': job['strategy'],
+        'number_of_robots': job['number_of_robots'],
+        'seed': job['seed'],
+        'node_count': simulation.get_number_of_nodes(),
+        'ticks': simulation.tick,
+        'covered': simulation.is_covered(),
+        'distance_covered': float(simulation.multi_robot_manager.distance_covered.sum()),
+        'coverage_time': getattr(simulation, 'coverage_time', None),
+        'wall_time': time.perf_counter() - start_time,
+    }
+
+class ResultCache:
+    ''' Result rows of finished jobs on disk, keyed by the network's contents, strategy, parameters and seed. '''
+    def __init__(self, cache_dir=DEFAULT_RESULT_CACHE_DIR):
+        ''' Result cache object constructor. '''
+        self.cache_dir = cache_dir
+        self.network_keys = {}
+
+    def key(self, job):
+        ''' Returns the cache key of a job. '''
+        if job['network_file'] not in self.network_keys:
+            self.network_keys[job['network_file']] = network_key(job['network_file'])
+        description = {
+            'version': RESULT_CACHE_FORMAT_VERSION,
+            'network': self.network_keys[job['network_file']],
+            'strategy': job['strategy'],
+            # Resolved, so that changing a strategy's default options changes the key
+            'strategy_options': strategy_parameters(job['strategy'], job.get('strategy_options')),
+            'number_of_robots': job['number_of_robots'],
+            'max_ticks': job['max_ticks'],
+            'speed': job.get('speed'),
+            'seed': job['seed'],
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def get(self, job):
+        ''' Returns the cached result row of a job, or None on a cache miss. '''
+        try:
+            with open(os.path.join(self.cache_dir, self.key(job) + '.json')) as row_file:
+                return json.load(row_file)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, job, row):
+        ''' Stores the result row of a job, written to a temporary file first so readers never see part of it. '''
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, self.key(job) + '.json')
+        with open(path + '.tmp', 'w') as row_file:
+            json.dump(row, row_file)
+        os.replace(path + '.tmp', path)
+
+def confidence_interval(values, confidence=0.95):
+    ''' Returns the mean of a sample and the half-width of its Student t confidence interval. '''
+    count = len(values)
+    mean = sum(values) / count
+    if count < 2:
+        return mean, math.inf
+    deviation = math.sqrt(sum((value - mean) ** 2 for value in values) / (count - 1))
+    return mean, stats.t.ppf(0.5 + confidence / 2, count - 1) * deviation / math.sqrt(count)
+
+def additional_seeds(distances, relative_precision, confidence, min_seeds, max_seeds):
+    ''' Returns how many more seeds a configuration needs for its mean distance to reach the target precision. '''
+    count = len(distances)
+    if count < min_seeds:
+        return min_seeds - count
+    if count >= max_seeds:
+        return 0
+    mean, half_width = confidence_interval(distances, confidence)
+    target = relative_precision * abs(mean)
+    if half_width <= target:
+        return 0
+    # The half-width shrinks with the square root of the number of seeds, at the spread seen so far
+    needed = math.ceil(count * (half_width / target) ** 2)
+    return min(max(needed - count, 1), max_seeds - count)
+
+def run_adaptive(configurations, results_path, relative_precision=0.05, confidence=0.95, min_seeds=3, max_seeds=30,
+                 workers=None, cache=None):
+    ''' Runs seeded repetitions of each configuration until its mean distance is known to a target precision.
+
+    A configuration stops once the confidence interval of its mean distance is within the relative precision
+    of the mean, or when it reaches the maximum number of seeds. Seeds count up from 0, and each batch is sized
+    from the spread seen so far. Jobs found in the cache are not run again. Every row, cached or new, is
+    streamed to the results CSV.
+    '''
+    distances = [[] for _ in configurations]
+    next_seeds = [0] * len(configurations)
+    outstanding = [0] * len(configurations)
+    futures = {}
+    with open(results_path, 'w', newline='') as results_file:
+        writer = csv.DictWriter(results_file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+
+        def record(index, row):
+            distances[index].append(row['distance_covered'])
+            writer.writerow(row)
+            results_file.flush()
+
+        def top_up(index):
+            # Loops while every new seed was already cached, since nothing is then left to wait for
+            while outstanding[index] == 0:
+                count = additional_seeds(distances[index], relative_precision, confidence, min_seeds, max_seeds)
+                if count == 0:
+                    return
+                for seed in range(next_seeds[index], next_seeds[index] + count):
+                    job = dict(configurations[index], seed=seed)
+                    row = cache.get(job) if cache is not None else None
+                    if row is not None:
+                        record(index, row)
+                    else:
+                        futures[executor.submit(run_job, job)] = index, job
+                        outstanding[index] += 1
+                next_seeds[index] += count
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            for index in range(len(configurations)):
+                top_up(index)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, job = futures.pop(future)
+                    row = future.result()
+                    if cache is not None:
+                        cache.put(job, row)
+                    record(index, row)
+                    outstanding[index] -= 1
+                    top_up(index)
+
+def load_results(results_path):
+    ''' Reads result rows back from a CSV file written by run_adaptive. '''
+    with open(results_path, newline='') as results_file:
+        rows = list(csv.DictReader(results_file))
+    for row in rows:
+        row['number_of_robots'] = int(row['number_of_robots'])
+        row['seed'] = int(row['seed'])
+        row['node_count'] = int(row['node_count'])
+        row['ticks'] = int(row['ticks'])
+        row['covered'] = row['covered'] == 'True'
+        row['distance_covered'] = float(row['distance_covered'])
+        row['coverage_time'] = float(row['coverage_time']) if row['coverage_time'] else None
+        row['wall_time'] = float(row['wall_time'])
+    return rows
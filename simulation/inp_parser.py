@@ -0,0 +1,56 @@
+import numpy as np
+
+NODE_SECTIONS = ('JUNCTIONS', 'RESERVOIRS', 'TANKS')
+LINK_SECTIONS = ('PIPES', 'PUMPS', 'VALVES')
+
+# Flow units given in US customary units put pipe lengths in feet. Lengths are converted to metres
+# so they match what wntr reports
+US_FLOW_UNITS = ('CFS', 'GPM', 'MGD', 'IMGD', 'AFD')
+FEET_TO_METRES = 0.3048
+
+def parse_inp(inp_file_path):
+    ''' Streams an INP file line by line, returning its nodes, coordinates and links in array form. '''
+    node_names = []
+    coordinates = {}
+    link_names, link_starts, link_ends, link_lengths = [], [], [], []
+    flow_units = 'GPM'
+    section = None
+
+    with open(inp_file_path, 'r') as file:
+        for line in file:
+            line = line.split(';', 1)[0].strip()
+            if not line:
+                continue
+            if line.startswith('['):
+                section = line.strip('[]').upper()
+                continue
+
+            parts = line.split()
+            if section in NODE_SECTIONS:
+                node_names.append(parts[0])
+            elif section in LINK_SECTIONS:
+                link_names.append(parts[0])
+                link_starts.append(parts[1])
+                link_ends.append(parts[2])
+                # Pumps and valves have no length
+                link_lengths.append(float(parts[3]) if section == 'PIPES' else 0.0)
+            elif section == 'COORDINATES':
+                coordinates[parts[0]] = (float(parts[1]), float(parts[2]))
+            elif section == 'OPTIONS' and parts[0].upper() == 'UNITS' and len(parts) > 1:
+                flow_units = parts[1].upper()
+
+    node_index = {name: i for i, name in enumerate(node_names)}
+    lengths = np.array(link_lengths, dtype=np.float64)
+    if flow_units in US_FLOW_UNITS:
+        lengths *= FEET_TO_METRES
+
+    return {
+        'node_names': node_names,
+        # Nodes without coordinates are placed at the origin, as wntr does
+        'coordinates': np.array([coordinates.get(name, (0.0, 0.0)) for name in node_names], dtype=np.float64).reshape(-1, 2),
+        'link_names': link_names,
+        'link_starts': np.array([node_index[name] for name in link_starts], dtype=np.int64),
+        'link_ends': np.array([node_index[name] for name in link_ends], dtype=np.int64),
+        'link_lengths': lengths,
+        'flow_units': flow_units,
+    }
@@ -1,96 +1,343 @@
+import copy
 import random
+import numpy as np
 from robot import Robot
-import math
+from communication import communication_components
+from distance_field import NearestSourceField
+from profiler import NULL_PHASE
 
 class InspectionStrategy:
     ''' Base class for implementing different inspection algorithms. '''
-    def __init__(self, network):
-        ''' Base constructor of inspection strategy class. '''
+    # Strategies that decide for all robots at once set this and override next_moves
+    moves_in_batches = False
+    # Strategies that never read per-robot visited bitsets clear this so the swarm does not allocate them
+    tracks_visited = True
+    # Set when the simulation is profiled, so subclasses can time their own phases and count their own events
+    profiler = None
+    # Attributes that change during a run, saved in checkpoints; subclasses with state of their own list theirs
+    state_attributes = ()
+
+    def __init__(self, network, rng=None):
+        ''' Base constructor of inspection strategy class, with the simulation's random number generator. '''
         self.network = network
+        self.rng = rng if rng is not None else random.Random()
 
     def next_move(self, robot, robots, network):
         ''' Determines the next move for a robot. Overridden by subclasses. '''
         pass
 
+    def next_moves(self, multi_robot_manager, robot_ids):
+        ''' Determines the next move of the given robots at once, as arrays of next positions, distances and edge ids.
+
+        Robots that cannot move get an edge id of -1. Overridden by subclasses that set moves_in_batches.
+        '''
+        pass
+
+    def update(self, multi_robot_manager):
+        ''' Called once at the end of every tick, after all robots have moved. Overridden by subclasses. '''
+        pass
+
+    def get_state(self):
+        ''' Returns a copy of the strategy's changing state, for checkpoints. '''
+        return {name: copy.deepcopy(getattr(self, name)) for name in self.state_attributes}
+
+    def set_state(self, state):
+        ''' Restores state returned by get_state. '''
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def phase(self, name):
+        ''' Returns a context that times a block of code as a profiling phase, doing nothing when not profiled. '''
+        return self.profiler.phase(name) if self.profiler is not None else NULL_PHASE
+
+    def count(self, name, amount=1):
+        ''' Adds to a profiling counter, doing nothing when not profiled. '''
+        if self.profiler is not None:
+            self.profiler.count(name, amount)
+
 class RandomWalkStrategy(InspectionStrategy):
     ''' Robots move randomly but avoid going back unless necessary. '''
-    def __init__(self, network):
-        ''' Calls constructor of base class. '''
-        super().__init__(network)
+    moves_in_batches = True
+    tracks_visited = False
+    state_attributes = ('batch_rng',)
+
+    def __init__(self, network, rng=None):
+        ''' Calls constructor of base class and keeps only the moves along pipes with a length. '''
+        super().__init__(network, rng)
+        # Moves as a CSR over slots, with a sorted (source, target) key per slot to find the way back
+        traversable = network.lengths > 0
+        sources = np.repeat(np.arange(network.number_of_nodes), np.diff(network.offsets))[traversable]
+        self.neighbors = network.neighbors[traversable]
+        self.lengths = network.lengths[traversable]
+        self.edge_ids = network.edge_ids[traversable]
+        self.offsets = np.zeros(network.number_of_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=network.number_of_nodes), out=self.offsets[1:])
+        slot_keys = sources * network.number_of_nodes + self.neighbors
+        self.slot_order = np.argsort(slot_keys)
+        self.sorted_slot_keys = slot_keys[self.slot_order]
+        # Batched choices draw from their own generator, seeded from the simulation's one
+        self.batch_rng = np.random.default_rng(self.rng.getrandbits(64))
+        self._moves = None
+
+    @property
+    def moves(self):
+        ''' Per-node lists of (neighbor, length, edge id) moves for the scalar step, built on first use. '''
+        if self._moves is None:
+            offsets = self.offsets.tolist()
+            slots = list(zip(self.neighbors.tolist(), self.lengths.tolist(), self.edge_ids.tolist()))
+            self._moves = [slots[offsets[node]:offsets[node + 1]] for node in range(self.network.number_of_nodes)]
+        return self._moves
 
     def next_move(self, robot, robots, network):
         ''' Makes random choice for robots next move. '''
-        neighbors, distances = network.get_neighbors_and_distance(robot.position)
-        valid_neighbors = [neighbor for neighbor in neighbors if neighbor != robot.position and distances[neighbor] > 0]
-        forward_moves = [neighbor for neighbor in valid_neighbors if neighbor != robot.last_position]
-        
+        moves = self.moves[robot.position]
+        forward_moves = [move for move in moves if move[0] != robot.last_position]
+
         if forward_moves:
-            new_position = random.choice(forward_moves)
-        elif robot.last_position in valid_neighbors:
-            new_position = robot.last_position
+            return self.rng.choice(forward_moves)
+        elif moves:
+            # Only the way back is left
+            return moves[0]
         else:
-            return None, 0
-        
-        distance = distances[new_position]
-        return new_position, distance
+            return None, 0, None
+
+    def next_moves(self, multi_robot_manager, robot_ids):
+        ''' Makes a random choice of next move for all given robots in one vectorised pass over the CSR slots. '''
+        positions = multi_robot_manager.positions[robot_ids]
+        last_positions = multi_robot_manager.last_positions[robot_ids]
+        return self.choose_moves(positions, last_positions, self.batch_rng.random(len(positions)))
+
+    def choose_moves(self, positions, last_positions, uniforms):
+        ''' Picks the next move of robots from their positions, last positions and one uniform draw each.
+
+        Each robot's move depends only on its own inputs, so the partitioned engine can split robots across
+        processes and still make exactly the same moves given the same draws.
+        '''
+        starts = self.offsets[positions]
+        degrees = self.offsets[positions + 1] - starts
+
+        # Slot leading back to the last position, if there is one
+        keys = positions * self.network.number_of_nodes + last_positions
+        found = np.minimum(np.searchsorted(self.sorted_slot_keys, keys), len(self.sorted_slot_keys) - 1)
+        has_back = (last_positions >= 0) & (self.sorted_slot_keys[found] == keys)
+        back_slots = np.where(has_back, self.slot_order[found], -1)
+
+        # Pick uniformly among the forward slots by skipping over the way back
+        forward_counts = degrees - has_back
+        slots = starts + (uniforms * forward_counts).astype(np.int64)
+        slots += has_back & (slots >= back_slots)
+        slots = np.where(forward_counts > 0, slots, back_slots)
+
+        # Robots on a node with no traversable pipe stay where they are
+        stuck = slots < 0
+        slots[stuck] = 0
+        next_positions = np.where(stuck, positions, self.neighbors[slots])
+        distances = np.where(stuck, 0.0, self.lengths[slots])
+        edge_ids = np.where(stuck, -1, self.edge_ids[slots])
+        return next_positions, distances, edge_ids
 
 class AntColonyOptimisation(InspectionStrategy):
     ''' Strategy based on ant colony optimisation (ACO) algorithm. '''
-    def __init__(self, network):
+    state_attributes = ('pheromones', 'last_updated', 'time')
+
+    def __init__(self, network, rng=None, evaporation_rate=0.0, communication_range=100):
         ''' Calls constructor of base class and intialises class variables. '''
-        super().__init__(network)
-        self.pheromones = {}
-        for edge in network.G.edges():
-            self.pheromones[(edge[0], edge[1])] = 0.1
-            self.pheromones[(edge[1], edge[0])] = 0.1
-        self.robot_knowledge = {}
-
-    def reinforce_pheromone(self, edge, amount=0.1):
-        ''' Reinforces edge if it exists in both directions. '''
-        if edge in self.pheromones:
-            self.pheromones[edge] += amount
-        reverse_edge = (edge[1], edge[0])
-        if reverse_edge in self.pheromones:
-            self.pheromones[reverse_edge] += amount
-
-    def update_robot_knowledge(self, robot_id, last_position, visited_nodes, visited_edges):
-        ''' Shares visited nodes and edges with all robots in communciation range. '''
-        for other_id, (other_last_position, nodes, edges) in self.robot_knowledge.items():
-            if other_id != robot_id and self.can_communicate(last_position, other_last_position):
-                visited_nodes |= nodes
-                visited_edges |= edges
-        
-        self.robot_knowledge[robot_id] = (last_position, visited_nodes, visited_edges)
-
-    def can_communicate(self, robot_id1, robot_id2):
-        ''' Calculates whether two robots are within communication range. '''
-        position1 = self.network.G.nodes[robot_id1]['pos']
-        position2 = self.network.G.nodes[robot_id2]['pos']
-
-        distance = math.sqrt((position1[0] - position2[0]) ** 2 + (position1[1] - position2[1]) ** 2)
-
-        # Distance must be less than given value (in ft) to communicate
-        return distance <= 100
+        super().__init__(network, rng)
+        # One pheromone level per undirected edge id, reinforced in both directions at once
+        self.pheromones = np.full(network.number_of_edges, 0.1)
+        self.last_updated = np.zeros(network.number_of_edges, dtype=np.int64)
+        self.evaporation_rate = evaporation_rate
+        self.time = 0
+        # Range is in metres, the units of pipe lengths, which the network coordinates are calibrated to
+        self.communication_range = communication_range
+
+    def get_pheromones(self, edge_ids):
+        ''' Returns the current pheromone levels of the given edges, including evaporation since last touched. '''
+        pheromones = self.pheromones[edge_ids]
+        if self.evaporation_rate:
+            pheromones = pheromones * (1 - self.evaporation_rate) ** (self.time - self.last_updated[edge_ids])
+        return pheromones
+
+    def reinforce_edge(self, edge_id, amount=0.1):
+        ''' Reinforces a single edge straight away, applying its pending evaporation first. '''
+        if self.evaporation_rate:
+            self.pheromones[edge_id] *= (1 - self.evaporation_rate) ** (self.time - self.last_updated[edge_id])
+            self.last_updated[edge_id] = self.time
+        self.pheromones[edge_id] += amount
+
+    def update(self, multi_robot_manager):
+        ''' Advances the evaporation clock and shares knowledge. '''
+        self.time += 1
+        with self.phase('share_knowledge'):
+            self.share_knowledge(multi_robot_manager)
+
+    def share_knowledge(self, multi_robot_manager):
+        ''' Gives each group of robots connected by communication range one shared row of visited nodes and edges. '''
+        # Robots on the same node always communicate, so the range query only runs over occupied nodes
+        nodes, robot_nodes = np.unique(multi_robot_manager.positions, return_inverse=True)
+        labels = communication_components(self.network.coordinates[nodes], self.communication_range)[robot_nodes]
+        # Labels number the groups from zero, and every robot that joins another's group counts as one message
+        self.count('messages', len(labels) - int(labels.max()) - 1)
+        # Moves made during the next tick are then seen by the whole group straight away
+        multi_robot_manager.share_knowledge(labels)
 
     def next_move(self, robot, robots, network):
         ''' Moves robot, prioritising unvisited nodes, then lowest pheromone path. '''
-        self.update_robot_knowledge(robot.robot_id, robot.position, robot.visited_nodes, robot.visited_edges)
-        neighbors, distances = network.get_neighbors_and_distance(robot.position)
-
-        unvisited_neighbors = [(neighbor, distances[neighbor]) for neighbor in neighbors if neighbor not in robot.visited_nodes]
-        
-        if unvisited_neighbors:
-            next_position = min(unvisited_neighbors, key=lambda x: self.pheromones.get((robot.position, x[0]), 0))[0]
-            distance = distances[next_position]
-            return next_position, distance
-        else:
-            valid_moves = [(neighbor, distances[neighbor]) for neighbor in neighbors]
-            next_position = min(valid_moves, key=lambda x: self.pheromones.get((robot.position, x[0]), float('inf')))[0]
-            distance = distances[next_position]
-            return next_position, distance
+        neighbors, distances, edge_ids = network.get_adjacency(robot.position)
+        if not neighbors:
+            return None, 0, None
+        pheromones = self.get_pheromones(edge_ids).tolist()
+
+        visited_nodes = robot.visited_nodes
+        unvisited_moves = [i for i, neighbor in enumerate(neighbors) if not visited_nodes[neighbor]]
+        best = min(unvisited_moves or range(len(neighbors)), key=pheromones.__getitem__)
+        # Reinforced as soon as the robot moves, so robots deciding later in the tick avoid the same edge
+        self.reinforce_edge(edge_ids[best])
+        return neighbors[best], distances[best], edge_ids[best]
+
+class FrontierRouting(InspectionStrategy):
+    ''' Routes each idle robot along the shortest path to the nearest uncovered node, which it claims as its target.
+
+    Coverage is shared swarm-wide, as with a central planner. The distance to the nearest uncovered, unclaimed
+    node is kept in one field for the whole swarm, and it is updated incrementally as nodes are covered or
+    claimed. A claimed target stops being a source of the field, so the next robot nearby is sent elsewhere.
+    '''
+    tracks_visited = False
+    state_attributes = ('covered', 'field', 'routes')
+
+    def __init__(self, network, rng=None):
+        ''' Calls constructor of base class and builds the field with every node uncovered. '''
+        super().__init__(network, rng)
+        self.covered = [False] * network.number_of_nodes
+        self.field = NearestSourceField(network, np.arange(network.number_of_nodes))
+        # Remaining route of each robot, with its target first and its next node last
+        self.routes = {}
+
+    def cover(self, node):
+        ''' Marks a node covered, so it is no longer a target. '''
+        if not self.covered[node]:
+            self.covered[node] = True
+            self.field.remove_sources([node])
+
+    def next_move(self, robot, robots, network):
+        ''' Moves robot one step along its route, first routing it to the nearest free target if it has none. '''
+        position = robot.position
+        self.cover(position)
+        route = self.routes.get(robot.robot_id)
+        # A claimed target can still be covered first by a robot passing through it on its own route
+        if not route or self.covered[route[0]]:
+            route = self.field.path(position)[::-1]
+            if not route:
+                self.routes.pop(robot.robot_id, None)
+                return None, 0, None
+            self.field.remove_sources([route[0]])
+            self.routes[robot.robot_id] = route
+            self.count('claims')
+
+        next_position = route.pop()
+        neighbors, distances, edge_ids = network.get_adjacency(position)
+        best = neighbors.index(next_position)
+        self.cover(next_position)
+        return next_position, distances[best], edge_ids[best]
 
 class MultiRobotManager:
-    ''' Manages multiple robots in the simulation. '''
-    def __init__(self, number_of_robots, initial_positions):
+    ''' Manages multiple robots in the simulation, keeping their state as arrays indexed by robot id. '''
+    def __init__(self, number_of_robots, initial_positions, number_of_nodes, number_of_edges, track_visited=True):
         ''' Initializes robots based on the given number and their initial positions. '''
-        self.robots = [Robot(i, position) for i, position in enumerate(initial_positions)]
\ No newline at end of file
+        self.positions = np.array(initial_positions, dtype=np.int64).reshape(number_of_robots)
+        self.last_positions = np.full(number_of_robots, -1, dtype=np.int64)
+        self.distance_covered = np.zeros(number_of_robots)
+        # Visited bitsets, one row per group of robots sharing knowledge (initially one per robot)
+        self.track_visited = track_visited
+        self.knowledge_rows = np.arange(number_of_robots)
+        if track_visited:
+            self.visited_nodes = np.zeros((number_of_robots, number_of_nodes), dtype=bool)
+            self.visited_edges = np.zeros((number_of_robots, number_of_edges), dtype=bool)
+            self.visited_nodes[self.knowledge_rows, self.positions] = True
+        else:
+            self.visited_nodes = self.visited_edges = None
+        self.robots = [Robot(self, i) for i in range(number_of_robots)]
+
+    def move_robot(self, robot_id, next_position, distance, edge_id):
+        ''' Moves a single robot along an edge. '''
+        self.last_positions[robot_id] = self.positions[robot_id]
+        self.positions[robot_id] = next_position
+        self.distance_covered[robot_id] += distance
+        if self.track_visited:
+            row = self.knowledge_rows[robot_id]
+            self.visited_nodes[row, next_position] = True
+            self.visited_edges[row, edge_id] = True
+
+    def move_robots(self, robot_ids, next_positions, distances, edge_ids):
+        ''' Moves a batch of robots at once, leaving those with an edge id of -1 where they are. '''
+        moving = edge_ids >= 0
+        robot_ids, next_positions = robot_ids[moving], next_positions[moving]
+        self.last_positions[robot_ids] = self.positions[robot_ids]
+        self.positions[robot_ids] = next_positions
+        self.distance_covered[robot_ids] += distances[moving]
+        if self.track_visited:
+            rows = self.knowledge_rows[robot_ids]
+            self.visited_nodes[rows, next_positions] = True
+            self.visited_edges[rows, edge_ids[moving]] = True
+
+    def get_state(self):
+        ''' Returns a copy of the swarm's state, for checkpoints, with the visited bitsets packed to bits. '''
+        state = {
+            'positions': self.positions.copy(),
+            'last_positions': self.last_positions.copy(),
+            'distance_covered': self.distance_covered.copy(),
+            'knowledge_rows': self.knowledge_rows.copy(),
+        }
+        if self.track_visited:
+            state['visited_shape'] = self.visited_nodes.shape, self.visited_edges.shape
+            state['visited_nodes'] = np.packbits(self.visited_nodes, axis=1)
+            state['visited_edges'] = np.packbits(self.visited_edges, axis=1)
+        return state
+
+    def set_state(self, state):
+        ''' Restores state returned by get_state, in place so robot views stay valid. '''
+        self.positions[:] = state['positions']
+        self.last_positions[:] = state['last_positions']
+        self.distance_covered[:] = state['distance_covered']
+        self.knowledge_rows = state['knowledge_rows'].copy()
+        if self.track_visited:
+            nodes_shape, edges_shape = state['visited_shape']
+            self.visited_nodes = np.unpackbits(state['visited_nodes'], axis=1, count=nodes_shape[1]).astype(bool)
+            self.visited_edges = np.unpackbits(state['visited_edges'], axis=1, count=edges_shape[1]).astype(bool)
+
+    def share_knowledge(self, labels):
+        ''' Merges the visited bitsets of each labelled group of robots into a single row they all share.
+
+        Rows are only rewritten for groups holding more than one distinct row, or whose row is still shared
+        with robots that are now in another group and so gets a copy of its own. Every other row is left as it
+        is, so a tick without new contacts costs a sort of the robots rather than a pass over the bitsets.
+        '''
+        number_of_rows = len(self.visited_nodes)
+        labels = np.asarray(labels)
+        # Distinct (group, row) pairs, ordered by group
+        pairs = np.unique(labels * number_of_rows + self.knowledge_rows)
+        pair_groups, rows = pairs // number_of_rows, pairs % number_of_rows
+        groups, starts = np.unique(pair_groups, return_index=True)
+        sizes = np.diff(np.append(starts, len(pairs)))
+
+        # A row stays with the first group holding it, and the other groups holding it need a free row instead
+        owner = np.zeros(len(pairs), dtype=bool)
+        owner[np.unique(rows, return_index=True)[1]] = True
+        targets = rows[starts]
+        needs_row = ~owner[starts]
+        free_rows = np.setdiff1d(np.arange(number_of_rows), rows)
+        targets[needs_row] = free_rows[:np.count_nonzero(needs_row)]
+
+        changed = (sizes > 1) | needs_row
+        if changed.any():
+            changed_pairs = np.repeat(changed, sizes)
+            changed_starts = np.cumsum(np.append(0, sizes[changed][:-1]))
+            # The merged rows are gathered before any is written, since a group's target may be another's source
+            merged_rows = rows[changed_pairs]
+            self.visited_nodes[targets[changed]] = np.logical_or.reduceat(
+                self.visited_nodes[merged_rows], changed_starts, axis=0
+            )
+            self.visited_edges[targets[changed]] = np.logical_or.reduceat(
+                self.visited_edges[merged_rows], changed_starts, axis=0
+            )
+        self.knowledge_rows = targets[np.searchsorted(groups, labels)]
@@ -1,58 +1,87 @@
 import os
-from simulation_manager import SimulationManager
-from inspection_strategy import RandomWalkStrategy, AntColonyOptimisation
-
-def run_simulation(network_file, number_of_robots, strategy_class):
-    ''' Runs simulation specified amount of times and returns average total distance. '''
-    total_distance = 0
-    for _ in range(5):
-        simulation = SimulationManager(network_file, number_of_robots, strategy_class)
-        simulation.run()
-        distance_covered = sum(robot.distance_covered for robot in simulation.multi_robot_manager.robots)
-        total_distance += distance_covered
-    average_distance = total_distance / 5
-    return average_distance
+from experiment import expand_configurations, run_adaptive, load_results, confidence_interval, ResultCache
+from route_inspection import cached_route_inspection
 
-def main():
-    ''' Defines metrics and runs simulation, plotting results in a table. '''
-    directory_path = "../networks/test_space/"
-    network_files = [file for file in os.listdir(directory_path) if file.endswith(".inp")]
-    number_of_robots = 10
-    strategies = [RandomWalkStrategy, AntColonyOptimisation]
+# Some networks have nodes a random walk can never reach (e.g. behind pumps), so runs are capped
+MAX_TICKS = 100000
+
+def summarise_distances(rows, confidence=0.95):
+    ''' Returns the mean total distance of each network, strategy and robot count with its confidence interval.
+
+    Each summary also counts the runs behind it and how many of them hit the tick limit before full coverage,
+    whose distances only bound the distance coverage would have taken.
+    '''
+    distances, uncovered = {}, {}
+    for row in rows:
+        key = (row['network'], row['strategy'], row['number_of_robots'])
+        distances.setdefault(key, []).append(row['distance_covered'])
+        uncovered[key] = uncovered.get(key, 0) + (not row['covered'])
+    return {key: confidence_interval(values, confidence) + (len(values), uncovered[key]) for key, values in distances.items()}
+
+def report(results_path, number_of_robots, baselines):
+    ''' Prints the comparison table from a results file, with 95% confidence intervals and baseline efficiency. '''
+    rows = load_results(results_path)
+    node_counts = {row['network']: row['node_count'] for row in rows}
+    summaries = summarise_distances(rows)
     results = {}
 
-    for network_file in network_files:
-        full_path = os.path.join(directory_path, network_file)
-        node_count = SimulationManager(full_path, number_of_robots, RandomWalkStrategy).get_number_of_nodes()
-        distances = {}
-        for strategy in strategies:
-            strategy_name = strategy.__name__
-            average_distance = run_simulation(full_path, number_of_robots, strategy)
-            distances[strategy_name] = average_distance
-        random_walk_distance = distances['RandomWalkStrategy']
-        pheromone_distance = distances['AntColonyOptimisation']
+    for network_file, node_count in node_counts.items():
+        random_walk_distance, random_walk_error, random_walk_seeds, random_walk_uncovered = \
+            summaries[(network_file, 'RandomWalkStrategy', number_of_robots)]
+        pheromone_distance, pheromone_error, pheromone_seeds, pheromone_uncovered = \
+            summaries[(network_file, 'AntColonyOptimisation', number_of_robots)]
         percentage_decrease = ((random_walk_distance - pheromone_distance) / random_walk_distance) * 100
         results[network_file] = {
             'Node Count': node_count,
+            'Baseline': baselines[network_file],
             'RandomWalkStrategy': random_walk_distance,
+            'RandomWalkStrategy Error': random_walk_error,
             'AntColonyOptimisation': pheromone_distance,
+            'AntColonyOptimisation Error': pheromone_error,
+            'Seeds': f"{random_walk_seeds}/{pheromone_seeds}",
+            'Uncovered': f"{random_walk_uncovered}/{pheromone_uncovered}",
             'Percentage Decrease': percentage_decrease,
         }
 
     sorted_results = sorted(results.items(), key=lambda x: x[1]['Node Count'])
 
-    print('-' * 88) 
-    print(f"{'Network File':<20} | {'No. of Nodes':<12} | {'Random (ft)':<15} | {'ACO (ft)':<15} | {'% Decrease':<15}")
-    print('-' * 88) 
+    # Efficiency is the route inspection lower bound over the distance a strategy actually covered. Uncovered
+    # counts the runs that hit the tick limit before covering the network, which are still in the means
+    print('-' * 182)
+    print(f"{'Network File':<20} | {'No. of Nodes':<12} | {'Baseline (m)':<15} | {'Random (m)':<22} | {'ACO (m)':<22} | {'Seeds':<7} | {'Uncovered':<9} | {'% Decrease':<15} | {'Random Eff.':<11} | {'ACO Eff.':<11}")
+    print('-' * 182)
 
     total_percentage_decrease = 0
     for network_file, info in sorted_results:
-        print(f"{network_file:<20} | {info['Node Count']:<12} | {int(info['RandomWalkStrategy']):<15} | {int(info['AntColonyOptimisation']):<15} | {info['Percentage Decrease']:<15.2f}")
+        random_efficiency = info['Baseline'] / info['RandomWalkStrategy']
+        pheromone_efficiency = info['Baseline'] / info['AntColonyOptimisation']
+        random_walk = f"{int(info['RandomWalkStrategy'])} ± {int(info['RandomWalkStrategy Error'])}"
+        pheromone = f"{int(info['AntColonyOptimisation'])} ± {int(info['AntColonyOptimisation Error'])}"
+        print(f"{network_file:<20} | {info['Node Count']:<12} | {int(info['Baseline']):<15} | {random_walk:<22} | {pheromone:<22} | {info['Seeds']:<7} | {info['Uncovered']:<9} | {info['Percentage Decrease']:<15.2f} | {random_efficiency:<11.3f} | {pheromone_efficiency:<11.3f}")
         total_percentage_decrease += info['Percentage Decrease']
-    print('-' * 88) 
+    print('-' * 182)
 
     average_percentage_decrease = total_percentage_decrease / len(sorted_results)
     print(f"Average Percentage Decrease: {average_percentage_decrease:.2f}%\n")
 
+def main():
+    ''' Defines metrics, runs seeded simulations in parallel until their means are precise and plots results in a table. '''
+    directory_path = "../networks/test_space/"
+    network_files = [os.path.join(directory_path, file) for file in os.listdir(directory_path) if file.endswith(".inp")]
+    number_of_robots = 10
+    strategies = ['RandomWalkStrategy', 'AntColonyOptimisation']
+    results_path = "results.csv"
+
+    # Seeds are added until the 95% confidence interval of each mean distance is within 5% of it, up to 30 seeds.
+    # Finished runs are cached, so a repeated sweep only runs what changed
+    configurations = expand_configurations(network_files, strategies, [number_of_robots], max_ticks=MAX_TICKS)
+    run_adaptive(configurations, results_path, relative_precision=0.05, min_seeds=3, max_seeds=30, cache=ResultCache())
+    # The bound does not depend on the number of robots, and is cached per network after the first sweep
+    baselines = {
+        os.path.basename(network_file): cached_route_inspection(network_file)['lower_bound']
+        for network_file in network_files
+    }
+    report(results_path, number_of_robots, baselines)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
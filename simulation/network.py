@@ -1,47 +1,139 @@
-import wntr
+import numpy as np
+from scipy.sparse import csr_matrix
+from inp_parser import parse_inp
+from network_cache import DEFAULT_CACHE_DIR, network_key, load_compiled, save_compiled
+
+# Zero-length links (pumps, valves) get a tiny weight, since scipy drops explicit zeros from sparse graphs
+ZERO_LENGTH_WEIGHT = 1e-9
+
+def network_graph(network):
+    ''' Returns the network as a symmetric sparse matrix of edge lengths, built straight from its CSR arrays. '''
+    size = network.number_of_nodes
+    return csr_matrix((np.maximum(network.lengths, ZERO_LENGTH_WEIGHT), network.neighbors, network.offsets), shape=(size, size))
+
+def compile_network(node_names, coordinates, link_starts, link_ends, link_lengths):
+    ''' Compiles a network given as link endpoint ids into edge arrays and CSR adjacency arrays. '''
+    number_of_nodes = len(node_names)
+    link_starts = np.asarray(link_starts, dtype=np.int64)
+    link_ends = np.asarray(link_ends, dtype=np.int64)
+    link_lengths = np.asarray(link_lengths, dtype=np.float64)
+
+    # Parallel links collapse into a single edge with the shortest pipe length. Links that are
+    # not pipes (pumps, valves) are kept with a length of zero unless a pipe runs alongside them
+    keep = link_starts != link_ends
+    low = np.minimum(link_starts, link_ends)[keep]
+    high = np.maximum(link_starts, link_ends)[keep]
+    sort_lengths = np.where(link_lengths[keep] > 0, link_lengths[keep], np.inf)
+    order = np.lexsort((sort_lengths, high, low))
+    low, high, sort_lengths = low[order], high[order], sort_lengths[order]
+    first = np.ones(len(low), dtype=bool)
+    first[1:] = (low[1:] != low[:-1]) | (high[1:] != high[:-1])
+    edge_endpoints = np.stack([low[first], high[first]], axis=1)
+    lengths_by_edge = np.where(np.isinf(sort_lengths[first]), 0.0, sort_lengths[first])
+    number_of_edges = len(edge_endpoints)
+
+    # Each undirected edge appears once in each direction, grouped by source node
+    edge_range = np.arange(number_of_edges, dtype=np.int64)
+    sources = np.concatenate([edge_endpoints[:, 0], edge_endpoints[:, 1]])
+    targets = np.concatenate([edge_endpoints[:, 1], edge_endpoints[:, 0]])
+    order = np.argsort(sources, kind='stable')
+    edge_ids = np.concatenate([edge_range, edge_range])[order]
+    offsets = np.zeros(number_of_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=number_of_nodes), out=offsets[1:])
+
+    # INP coordinates are only drawing positions in arbitrary units. They are scaled so that straight-line distances
+    # are in the same units as pipe lengths (m), using the median ratio of pipe length to endpoint distance
+    coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    endpoint_distances = np.linalg.norm(coordinates[edge_endpoints[:, 0]] - coordinates[edge_endpoints[:, 1]], axis=1)
+    measured = (lengths_by_edge > 0) & (endpoint_distances > 0)
+    if measured.any():
+        coordinates = coordinates * np.median(lengths_by_edge[measured] / endpoint_distances[measured])
+
+    return {
+        'node_names': np.array(node_names, dtype=str),
+        'coordinates': coordinates,
+        'edge_endpoints': edge_endpoints,
+        'edge_lengths': lengths_by_edge,
+        'offsets': offsets,
+        'neighbors': targets[order],
+        'lengths': lengths_by_edge[edge_ids],
+        'edge_ids': edge_ids,
+    }
+
+def compile_inp(network_file):
+    ''' Parses an INP file and compiles it into the network arrays. '''
+    parsed = parse_inp(network_file)
+    return compile_network(
+        parsed['node_names'], parsed['coordinates'], parsed['link_starts'], parsed['link_ends'], parsed['link_lengths']
+    )
 
 class Network:
     ''' Manages the water distribution network model. '''
-    def __init__(self, network_file):
-        ''' Network object constructor '''
-        self.wn = wntr.network.WaterNetworkModel(network_file)
-        self.G = self.wn.get_graph().to_undirected()
-        self.assign_edge_lengths()
-
-    def assign_edge_lengths(self):
-        ''' Assigns lengths to edges based on pipe lengths in the inp file. '''
-        for pipe_name, pipe in self.wn.pipes():
-            start_node, end_node = pipe.start_node_name, pipe.end_node_name
-            length = pipe.length
-            # MultiDiGraph, so may be multiple edges between two nodes...
-            if self.G.has_edge(start_node, end_node):
-                for key in self.G[start_node][end_node]:
-                    self.G[start_node][end_node][key]['length'] = length
-        
+    def __init__(self, network_file, cache_dir=DEFAULT_CACHE_DIR):
+        ''' Network object constructor; loads the compiled network from the cache, or compiles and caches it. '''
+        self.network_file = network_file
+        arrays = None
+        if cache_dir is not None:
+            key = network_key(network_file)
+            arrays = load_compiled(cache_dir, key)
+        if arrays is None:
+            arrays = compile_inp(network_file)
+            if cache_dir is not None:
+                save_compiled(cache_dir, key, arrays)
+        self.load_arrays(arrays)
+
+    def load_arrays(self, arrays):
+        ''' Sets up the network from its compiled arrays, which may be read-only memory maps. '''
+        self.node_names = arrays['node_names']
+        self.coordinates = arrays['coordinates']
+        self.edge_endpoints = arrays['edge_endpoints']
+        self.edge_lengths = arrays['edge_lengths']
+        self.offsets = arrays['offsets']
+        self.neighbors = arrays['neighbors']
+        self.lengths = arrays['lengths']
+        self.edge_ids = arrays['edge_ids']
+        self.number_of_nodes = len(self.node_names)
+        self.number_of_edges = len(self.edge_lengths)
+        # Python-object views of the arrays, built only if something asks for them
+        self._node_index = None
+        self._adjacency = None
+
+    @property
+    def node_index(self):
+        ''' Dictionary from node name to node id, built on first use. '''
+        if self._node_index is None:
+            self._node_index = {name: i for i, name in enumerate(self.node_names.tolist())}
+        return self._node_index
+
+    @property
+    def adjacency(self):
+        ''' Per-node lists of the CSR rows, for cheap scalar access in per-robot strategies, built on first use.
+
+        Batched and partitioned runs index the CSR arrays directly and never build these.
+        '''
+        if self._adjacency is None:
+            self._adjacency = list(zip(
+                self.split_rows(self.neighbors), self.split_rows(self.lengths), self.split_rows(self.edge_ids)
+            ))
+        return self._adjacency
+
+    def split_rows(self, values):
+        ''' Splits a CSR-ordered array into per-node lists of python scalars. '''
+        values = values.tolist()
+        offsets = self.offsets.tolist()
+        return [values[offsets[node]:offsets[node + 1]] for node in range(self.number_of_nodes)]
+
     def scale_network(self, window_width, window_height, margin):
-        ''' Scales the network to fit the window. '''
-        min_x = min([self.G.nodes[node]['pos'][0] for node in self.G.nodes])
-        min_y = min([self.G.nodes[node]['pos'][1] for node in self.G.nodes])
-        max_x = max([self.G.nodes[node]['pos'][0] for node in self.G.nodes])
-        max_y = max([self.G.nodes[node]['pos'][1] for node in self.G.nodes])
+        ''' Returns node positions scaled to fit the window, leaving the network in real units. '''
+        min_x, min_y = self.coordinates.min(axis=0)
+        max_x, max_y = self.coordinates.max(axis=0)
         scale_x = (window_width - 2 * margin) / (max_x - min_x)
         scale_y = (window_height - 2 * margin) / (max_y - min_y)
         offset_x = -min_x * scale_x + margin
         offset_y = -min_y * scale_y + margin
-        for node in self.G.nodes:
-            pos = self.G.nodes[node]['pos']
-            scaled_pos = (int(pos[0] * scale_x + offset_x), int(pos[1] * scale_y + offset_y))
-            self.G.nodes[node]['pos'] = scaled_pos
-
-    def get_neighbors_and_distance(self, node):
-        ''' Returns neighbors and distances from a node. '''
-        neighbors = list(self.G.neighbors(node))
-        distances = {}
-        for neighbor in neighbors:
-            key = next(iter(self.G[node][neighbor]), None)
-            if key is not None and 'length' in self.G[node][neighbor][key]:
-                distances[neighbor] = self.G[node][neighbor][key]['length']
-            else:
-                # If no length found, set default value to zero then this is later ignnored
-                distances[neighbor] = 0
-        return neighbors, distances
\ No newline at end of file
+        scaled = self.coordinates * (scale_x, scale_y) + (offset_x, offset_y)
+        return [tuple(pos) for pos in scaled.astype(int).tolist()]
+
+    def get_adjacency(self, node):
+        ''' Returns the neighbors of a node id with the matching edge lengths and edge ids. '''
+        return self.adjacency[node]
@@ -0,0 +1,46 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import numpy as np
+
+# Bumped whenever the layout of the compiled arrays changes, so stale entries are never loaded
+CACHE_FORMAT_VERSION = 3
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'swarm_robotics_sim', 'networks')
+
+COMPILED_ARRAYS = (
+    'node_names', 'coordinates', 'edge_endpoints', 'edge_lengths',
+    'offsets', 'neighbors', 'lengths', 'edge_ids',
+)
+
+def network_key(network_file):
+    ''' Returns the cache key of an INP file, a hash of its contents and the cache format. '''
+    digest = hashlib.sha256(f'v{CACHE_FORMAT_VERSION}:'.encode())
+    with open(network_file, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_compiled(cache_dir, key):
+    ''' Memory-maps the compiled arrays of a network, returning None on a cache miss. '''
+    entry = os.path.join(cache_dir, key)
+    if not os.path.isdir(entry):
+        return None
+    try:
+        return {name: np.load(os.path.join(entry, name + '.npy'), mmap_mode='r') for name in COMPILED_ARRAYS}
+    except (OSError, ValueError):
+        return None
+
+def save_compiled(cache_dir, key, arrays):
+    ''' Writes the compiled arrays of a network to the cache, one .npy file per array. '''
+    os.makedirs(cache_dir, exist_ok=True)
+    # Written to a temporary directory first, then renamed into place so readers never see a partial entry
+    staging = tempfile.mkdtemp(dir=cache_dir, prefix='.' + key)
+    try:
+        for name in COMPILED_ARRAYS:
+            np.save(os.path.join(staging, name + '.npy'), arrays[name])
+        os.rename(staging, os.path.join(cache_dir, key))
+    except OSError:
+        # Another process may have cached the same network first
+        shutil.rmtree(staging, ignore_errors=True)
@@ -0,0 +1,179 @@
+import multiprocessing
+import os
+import threading
+from multiprocessing import shared_memory
+import numpy as np
+from network import Network
+from partition import partition_network
+from simulation_manager import SimulationManager
+from inspection_strategy import RandomWalkStrategy
+
+RUN, STOP = 1, 0
+
+def create_shared(array):
+    ''' Copies an array into a new shared memory block, returning the block and an array view onto it. '''
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    view[...] = array
+    return block, view
+
+def attach_shared(spec):
+    ''' Opens a shared memory block created by another process, returning the block and an array view onto it. '''
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+def run_worker(worker_id, network_file, strategy, strategy_options, shared_specs, barrier):
+    ''' Steps the robots inside one partition of the network every tick, until the coordinator stops the run.
+
+    Robots whose move takes them into another partition are written to this worker's outbox with their new
+    partition, and picked up by the worker owning it at the start of the next tick. Outboxes alternate between two buffers by
+    tick, so a worker can fill one while the others are still reading the previous tick's.
+    '''
+    # The blocks stay open for the life of the worker and are released when it exits
+    blocks, arrays = zip(*(attach_shared(spec) for spec in shared_specs.values()))
+    shared = dict(zip(shared_specs, arrays))
+    try:
+        network = Network(network_file)
+        strategy = strategy(network, **(strategy_options or {}))
+        parts, control = shared['parts'], shared['control']
+        positions, last_positions = shared['positions'], shared['last_positions']
+        distance_covered, uniforms = shared['distance_covered'], shared['uniforms']
+        covered_nodes, covered_edges = shared['covered_nodes'], shared['covered_edges']
+        outboxes, outbox_parts, outbox_counts = shared['outboxes'], shared['outbox_parts'], shared['outbox_counts']
+        owned = np.nonzero(parts[positions] == worker_id)[0]
+        tick = 0
+        while True:
+            barrier.wait()
+            if control[0] == STOP:
+                break
+            previous, current = (tick + 1) % 2, tick % 2
+            # Destinations are read from the outbox, since a robot may already have moved on in its new worker
+            arrivals, destinations = [], []
+            for source in range(len(outboxes[0])):
+                arrivals.append(outboxes[previous, source, :outbox_counts[previous, source]])
+                destinations.append(outbox_parts[previous, source, :outbox_counts[previous, source]])
+            arrivals, destinations = np.concatenate(arrivals), np.concatenate(destinations)
+            owned = np.concatenate([owned, arrivals[destinations == worker_id]])
+
+            next_positions, distances, edge_ids = strategy.choose_moves(
+                positions[owned], last_positions[owned], uniforms[owned]
+            )
+            moving = edge_ids >= 0
+            moved = owned[moving]
+            last_positions[moved] = positions[moved]
+            positions[moved] = next_positions[moving]
+            distance_covered[moved] += distances[moving]
+            covered_nodes[next_positions[moving]] = True
+            covered_edges[edge_ids[moving]] = True
+
+            next_parts = parts[next_positions]
+            leaving = next_parts != worker_id
+            count = np.count_nonzero(leaving)
+            outbox_counts[current, worker_id] = count
+            outboxes[current, worker_id, :count] = owned[leaving]
+            outbox_parts[current, worker_id, :count] = next_parts[leaving]
+            owned = owned[~leaving]
+            barrier.wait()
+            tick += 1
+    except BaseException:
+        # Releases every other process from the barrier, so a failed worker cannot hang the run
+        barrier.abort()
+        raise
+
+class PartitionedSimulationManager(SimulationManager):
+    ''' Runs a simulation with the network split into partitions, each stepped by its own worker process.
+
+    Robot arrays, coverage bitmaps and the partition map live in shared memory while the run is going, so
+    workers exchange boundary coverage simply by writing to it, and robots are handed between workers by id.
+    This process stays the coordinator: every tick it draws one uniform per robot from the strategy's batch
+    generator, exactly as the single-process engine does, releases the workers and waits for them, then
+    updates the coverage count and notifies observers. Given the same seed, a run matches the single-process
+    engine move for move. Only strategies whose moves are a function of each robot's own state and one draw
+    (those with choose_moves) can be split like this.
+    '''
+    def __init__(self, network_file, number_of_robots=1, strategy=RandomWalkStrategy, workers=None, **kwargs):
+        ''' Partitioned simulation manager constructor; workers defaults to one per CPU. '''
+        if not hasattr(strategy, 'choose_moves'):
+            raise ValueError(f"{strategy.__name__} moves robots one after another, so it cannot be partitioned")
+        super().__init__(network_file, number_of_robots, strategy, **kwargs)
+        self.workers = workers or os.cpu_count()
+        self.config.update(workers=workers)
+        self.parts = partition_network(self.network, self.workers)
+
+    def run(self):
+        ''' Moves the run's state into shared memory, starts the workers, runs and then takes the state back. '''
+        manager = self.multi_robot_manager
+        number_of_robots = len(manager.positions)
+        arrays = {
+            'parts': self.parts,
+            'control': np.array([RUN], dtype=np.int64),
+            'positions': manager.positions,
+            'last_positions': manager.last_positions,
+            'distance_covered': manager.distance_covered,
+            'uniforms': np.zeros(number_of_robots),
+            'covered_nodes': self.covered_nodes,
+            'covered_edges': self.covered_edges,
+            'outboxes': np.zeros((2, self.workers, number_of_robots), dtype=np.int64),
+            'outbox_parts': np.zeros((2, self.workers, number_of_robots), dtype=np.int64),
+            'outbox_counts': np.zeros((2, self.workers), dtype=np.int64),
+        }
+        blocks, shared = {}, {}
+        for name, array in arrays.items():
+            blocks[name], shared[name] = create_shared(array)
+        shared_specs = {name: (blocks[name].name, array.shape, array.dtype.str) for name, array in arrays.items()}
+        self.use_arrays(shared)
+        self.control = shared['control']
+        self.uniforms = shared['uniforms']
+
+        self.barrier = multiprocessing.Barrier(self.workers + 1)
+        processes = [
+            multiprocessing.Process(target=run_worker, args=(
+                worker_id, self.network.network_file, type(self.strategy), self.config['strategy_options'],
+                shared_specs, self.barrier,
+            ), daemon=True)
+            for worker_id in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            super().run()
+        finally:
+            self.control[0] = STOP
+            try:
+                self.barrier.wait()
+            except threading.BrokenBarrierError:
+                pass
+            for process in processes:
+                process.join()
+            # Observers and results read the state after the run, so it is copied out before the blocks go
+            self.use_arrays({name: view.copy() for name, view in shared.items()})
+            del self.control, self.uniforms, shared
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+        failed = [process.exitcode for process in processes if process.exitcode]
+        if failed:
+            raise RuntimeError(f"{len(failed)} partition worker(s) failed")
+
+    def use_arrays(self, arrays):
+        ''' Points the simulation's state at the given arrays. '''
+        manager = self.multi_robot_manager
+        manager.positions = arrays['positions']
+        manager.last_positions = arrays['last_positions']
+        manager.distance_covered = arrays['distance_covered']
+        self.covered_nodes = arrays['covered_nodes']
+        self.covered_edges = arrays['covered_edges']
+
+    def step(self):
+        ''' Draws this tick's uniforms, lets every worker move its robots and counts the swarm's coverage. '''
+        self.strategy.batch_rng.random(out=self.uniforms)
+        try:
+            # Once to start the workers on the tick and once to wait for them to finish it
+            self.barrier.wait()
+            self.barrier.wait()
+        except threading.BrokenBarrierError:
+            raise RuntimeError('A partition worker failed') from None
+        self.covered_count = int(np.count_nonzero(self.covered_nodes))
+        self.strategy.update(self.multi_robot_manager)
+        self.tick += 1
@@ -0,0 +1,142 @@
+import json
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+
+# Shared do-nothing context, used for strategy phases when the simulation is not profiled
+NULL_PHASE = nullcontext()
+
+class Profiler:
+    ''' Cumulative per-phase timers and event counters for a simulation, with an optional sampled Chrome trace.
+
+    Attaching a profiler wraps the simulation's step and observers, its robot manager's moves and its strategy's
+    decisions and end-of-tick update on the instances themselves, so a run without a profiler executes exactly
+    the unwrapped code and any strategy subclass is timed without extra code. Every tick is timed. When a
+    trace interval is given, every that many ticks its phases and counters are also recorded as trace events
+    that can be saved in Chrome trace-event format and opened in chrome://tracing or Perfetto.
+    '''
+    def __init__(self, trace_every=None):
+        ''' Profiler object constructor; trace_every is the tick interval of traced ticks, or None for no trace. '''
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.trace_every = trace_every
+        self.trace_events = []
+        self.tracing = False
+        self.origin = time.perf_counter()
+
+    def attach(self, simulation):
+        ''' Instruments a simulation, its robot manager and its strategy. '''
+        manager = simulation.multi_robot_manager
+        strategy = simulation.strategy
+        strategy.profiler = self
+
+        step = simulation.step
+        def profiled_step():
+            self.tracing = bool(self.trace_every) and simulation.tick % self.trace_every == 0
+            self.record('tick', step)
+            if self.tracing:
+                self.trace_counters()
+        simulation.step = profiled_step
+        simulation.notify_observers = self.timed('observers', simulation.notify_observers)
+        simulation.mark_covered = self.timed('coverage', simulation.mark_covered)
+
+        # Per-robot calls are only accumulated, since tracing each of them would swamp the trace
+        strategy.next_move = self.timed('next_move', strategy.next_move, traced=False)
+        strategy.next_moves = self.timed('next_moves', strategy.next_moves)
+        strategy.update = self.timed('update', strategy.update)
+
+        move_robot = manager.move_robot
+        def profiled_move_robot(robot_id, next_position, distance, edge_id):
+            self.count('moves')
+            if next_position == manager.last_positions[robot_id]:
+                self.count('backtracks')
+            self.record('move_robot', move_robot, (robot_id, next_position, distance, edge_id), traced=False)
+        manager.move_robot = profiled_move_robot
+
+        move_robots = manager.move_robots
+        def profiled_move_robots(robot_ids, next_positions, distances, edge_ids):
+            moving = edge_ids >= 0
+            self.count('moves', int(moving.sum()))
+            self.count('backtracks', int((moving & (next_positions == manager.last_positions[robot_ids])).sum()))
+            self.record('move_robots', move_robots, (robot_ids, next_positions, distances, edge_ids))
+        manager.move_robots = profiled_move_robots
+
+    def timed(self, name, function, traced=True):
+        ''' Wraps a function so every call to it is timed as the given phase. '''
+        def timed_function(*args):
+            return self.record(name, function, args, traced)
+        return timed_function
+
+    def record(self, name, function, args=(), traced=True):
+        ''' Calls a function, adding its duration to the given phase and to the trace if this tick is traced. '''
+        start = time.perf_counter()
+        result = function(*args)
+        end = time.perf_counter()
+        self.add_time(name, start, end, traced)
+        return result
+
+    def add_time(self, name, start, end, traced=True):
+        ''' Adds a timed interval to the given phase, and to the trace if this tick is traced. '''
+        self.totals[name] += end - start
+        self.calls[name] += 1
+        if traced and self.tracing:
+            self.trace_events.append({
+                'name': name, 'ph': 'X', 'pid': 0, 'tid': 0,
+                'ts': (start - self.origin) * 1e6, 'dur': (end - start) * 1e6,
+            })
+
+    def phase(self, name):
+        ''' Returns a context that times a block of code as the given phase. '''
+        return ProfiledPhase(self, name)
+
+    def count(self, name, amount=1):
+        ''' Adds to an event counter. '''
+        self.counters[name] += amount
+
+    def trace_counters(self):
+        ''' Adds the current counter values to the trace. '''
+        self.trace_events.append({
+            'name': 'counters', 'ph': 'C', 'pid': 0, 'tid': 0,
+            'ts': (time.perf_counter() - self.origin) * 1e6, 'args': dict(self.counters),
+        })
+
+    def save_trace(self, path):
+        ''' Writes the sampled trace as a Chrome trace-event JSON file. '''
+        with open(path, 'w') as trace_file:
+            json.dump({'traceEvents': self.trace_events, 'displayTimeUnit': 'ms'}, trace_file)
+
+    def summary(self):
+        ''' Returns the cumulative time, number of calls and counters of every phase as a dict. '''
+        return {
+            'phases': {name: {'seconds': self.totals[name], 'calls': self.calls[name]} for name in self.totals},
+            'counters': dict(self.counters),
+        }
+
+    def report(self):
+        ''' Returns a table of the time spent in each phase, as a share of the total tick time, and the counters. '''
+        tick_time = self.totals.get('tick') or sum(self.totals.values()) or 1.0
+        lines = [f"{'Phase':<16} | {'Calls':>10} | {'Total (s)':>10} | {'Mean (us)':>10} | {'Share':>7}", '-' * 65]
+        for name, total in sorted(self.totals.items(), key=lambda item: -item[1]):
+            lines.append(f"{name:<16} | {self.calls[name]:>10} | {total:>10.3f} | "
+                         f"{total * 1e6 / self.calls[name]:>10.1f} | {total / tick_time:>7.1%}")
+        if self.counters:
+            lines += ['-' * 65, f"{'Counter':<16} | {'Count':>10}"]
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<16} | {value:>10}")
+        return '\n'.join(lines)
+
+class ProfiledPhase:
+    ''' Context that times a block of code as a profiler phase. '''
+    def __init__(self, profiler, name):
+        ''' Profiled phase object constructor. '''
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        ''' Starts timing the block. '''
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        ''' Adds the block's duration to the phase. '''
+        self.profiler.add_time(self.name, self.start, time.perf_counter())
@@ -0,0 +1,108 @@
+import time
+import numpy as np
+import pygame
+
+class PygameRenderer:
+    ''' Live view of a simulation, attached to a SimulationManager as an optional observer.
+
+    The scaled network is drawn once onto a cached background surface. Each frame only restores the background
+    under the robots' previous sprites, adds newly covered edges to the background and draws the robots again,
+    updating just those dirty rectangles. Frames are capped at a target FPS, so the simulation is never held
+    back by drawing however fast it runs. For demos the simulation itself can be slowed to a number of ticks
+    per second.
+    '''
+    def __init__(self, window_width=1200, window_height=800, margin=50, target_fps=60, ticks_per_second=None):
+        ''' Renderer object constructor; the window is only opened once the simulation starts. '''
+        self.window_width = window_width
+        self.window_height = window_height
+        self.margin = margin
+        self.frame_interval = 1.0 / target_fps if target_fps else 0.0
+        self.tick_interval = 1.0 / ticks_per_second if ticks_per_second else 0.0
+        self.colors = {
+            'background': (211, 211, 211),
+            'network_line': (0, 0, 128),
+            'covered_line': (46, 139, 87),
+            'node': (0, 128, 128),
+            'robot': (255, 127, 80),
+        }
+
+    def on_start(self, simulation):
+        ''' Opens the pygame window, scales the network to fit it and renders the static background once. '''
+        pygame.init()
+        self.screen = pygame.display.set_mode((self.window_width, self.window_height))
+        self.positions = simulation.network.scale_network(self.window_width, self.window_height, self.margin)
+        self.background = pygame.Surface((self.window_width, self.window_height))
+        self.background.fill(self.colors['background'])
+        self.draw_network(simulation.network)
+        self.drawn_edges = np.zeros(simulation.network.number_of_edges, dtype=bool)
+        self.robot_rects = []
+        self.next_frame = 0.0
+        self.next_tick = time.perf_counter()
+        self.screen.blit(self.background, (0, 0))
+        pygame.display.flip()
+
+    def on_tick(self, simulation):
+        ''' Draws a frame if one is due, returning False if the window was closed. '''
+        if self.tick_interval:
+            self.next_tick += self.tick_interval
+            time.sleep(max(0.0, self.next_tick - time.perf_counter()))
+        now = time.perf_counter()
+        if now < self.next_frame:
+            return True
+        self.next_frame = now + self.frame_interval
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+        self.draw_frame(simulation)
+        return True
+
+    def on_finish(self, simulation):
+        ''' Closes the pygame window. '''
+        pygame.quit()
+
+    def draw_network(self, network):
+        ''' Draws the water distribution network and nodes onto the background surface. '''
+        for start_node, end_node in network.edge_endpoints.tolist():
+            start_pos = self.positions[start_node]
+            end_pos = self.positions[end_node]
+            pygame.draw.line(self.background, self.colors['network_line'], start_pos, end_pos, 1)
+        for node_pos in self.positions:
+            pygame.draw.circle(self.background, self.colors['node'], node_pos, 2)
+
+    def draw_frame(self, simulation):
+        ''' Redraws newly covered edges and the robots, updating only the parts of the screen that changed. '''
+        dirty_rects = list(self.robot_rects)
+
+        new_edges = np.nonzero(simulation.covered_edges & ~self.drawn_edges)[0]
+        self.drawn_edges[new_edges] = True
+        for start_node, end_node in simulation.network.edge_endpoints[new_edges].tolist():
+            start_pos = self.positions[start_node]
+            end_pos = self.positions[end_node]
+            dirty_rects.append(pygame.draw.line(self.background, self.colors['covered_line'], start_pos, end_pos, 2))
+
+        for rect in dirty_rects:
+            self.screen.blit(self.background, rect, rect)
+
+        # Robots sharing a node share a sprite
+        self.robot_rects = [
+            pygame.draw.circle(self.screen, self.colors['robot'], self.positions[node], 5)
+            for node in np.unique(simulation.multi_robot_manager.positions).tolist()
+        ]
+        pygame.display.update(dirty_rects + self.robot_rects)
+
+def save_heatmap(network, edge_counts, path, window_width=1200, window_height=800, margin=50):
+    ''' Draws every edge coloured by how often it was traversed, from blue once to red most often, and saves it. '''
+    positions = network.scale_network(window_width, window_height, margin)
+    surface = pygame.Surface((window_width, window_height))
+    surface.fill((211, 211, 211))
+    heat = np.log1p(edge_counts) / max(np.log1p(edge_counts.max()), 1e-9)
+    # Least traversed edges are drawn first so the hot ones stay on top
+    for edge_id in np.argsort(edge_counts, kind='stable').tolist():
+        start_node, end_node = network.edge_endpoints[edge_id].tolist()
+        if edge_counts[edge_id]:
+            color = (int(255 * heat[edge_id]), 0, int(255 * (1 - heat[edge_id])))
+            pygame.draw.line(surface, color, positions[start_node], positions[end_node], 2)
+        else:
+            pygame.draw.line(surface, (128, 128, 128), positions[start_node], positions[end_node], 1)
+    pygame.image.save(surface, path)
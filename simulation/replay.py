@@ -0,0 +1,48 @@
+import argparse
+import numpy as np
+from trajectory import Trajectory
+
+# Fractions of the network at which the time to reach that coverage is reported
+COVERAGE_MILESTONES = (0.5, 0.9, 0.99, 1.0)
+
+def summarise(trajectory):
+    ''' Prints the coverage curve milestones and the most redundantly traversed pipes of a trajectory. '''
+    network = trajectory.network
+    ticks, covered = trajectory.coverage_curve()
+    traversals = trajectory.edge_traversals()
+    print(f"{trajectory.header['strategy']} with {trajectory.header['number_of_robots']} robots, "
+          f"{len(trajectory)} records up to tick {int(ticks[-1])}")
+    for fraction in COVERAGE_MILESTONES:
+        reached = np.nonzero(covered >= np.ceil(fraction * network.number_of_nodes))[0]
+        print(f"{fraction:>6.0%} of nodes covered at tick {int(ticks[reached[0]]) if len(reached) else '-'}")
+
+    redundant = np.maximum(traversals - 1, 0)
+    print(f"Pipes traversed: {np.count_nonzero(traversals)} of {network.number_of_edges}, "
+          f"redundant traversals: {int(redundant.sum())} ({float(redundant @ network.edge_lengths):.0f} m)")
+    print(f"{'Pipe':<24} | {'Traversals':>10}")
+    for edge_id in np.argsort(-traversals, kind='stable')[:10].tolist():
+        start_node, end_node = network.edge_endpoints[edge_id].tolist()
+        print(f"{network.node_names[start_node] + ' - ' + network.node_names[end_node]:<24} | {traversals[edge_id]:>10}")
+
+def main():
+    ''' Analyses a recorded trajectory, and optionally plays it back or saves a redundancy heatmap. '''
+    parser = argparse.ArgumentParser(description='Replays and analyses a recorded trajectory log.')
+    parser.add_argument('trajectory', help='directory written by a TrajectoryRecorder')
+    parser.add_argument('--render', action='store_true', help='play the run back in the pygame view')
+    parser.add_argument('--from-tick', type=int, default=0)
+    parser.add_argument('--ticks-per-second', type=float, default=None)
+    parser.add_argument('--heatmap', help='save an image of how often each pipe was traversed')
+    args = parser.parse_args()
+
+    trajectory = Trajectory(args.trajectory)
+    summarise(trajectory)
+    # pygame is only needed, and so only imported, for drawing
+    if args.heatmap:
+        from renderer import save_heatmap
+        save_heatmap(trajectory.network, trajectory.edge_traversals(), args.heatmap)
+    if args.render:
+        from renderer import PygameRenderer
+        trajectory.play(PygameRenderer(ticks_per_second=args.ticks_per_second), args.from_tick)
+
+if __name__ == "__main__":
+    main()
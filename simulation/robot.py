@@ -1,18 +1,42 @@
 class Robot:
-    ''' Represents the state of a robot and its behavior in the network. '''
-    def __init__(self, robot_id, position):
-        ''' Initializes a new robot with a unique ID and starting position. '''
+    ''' Represents the state of a robot and its behavior in the network, as a view onto the swarm's arrays. '''
+    def __init__(self, multi_robot_manager, robot_id):
+        ''' Initializes a view of the robot with the given ID in the multi robot manager. '''
+        self.multi_robot_manager = multi_robot_manager
         self.robot_id = robot_id
-        self.position = position
-        self.last_position = None
-        self.distance_covered = 0.0
-        self.visited_nodes = {position}
-        self.visited_edges = set()
 
-    def move(self, next_position, distance):
+    @property
+    def position(self):
+        ''' Node id the robot is currently at. '''
+        return int(self.multi_robot_manager.positions[self.robot_id])
+
+    @property
+    def last_position(self):
+        ''' Node id the robot was at before its last move, or None if it has not moved yet. '''
+        last_position = int(self.multi_robot_manager.last_positions[self.robot_id])
+        return last_position if last_position >= 0 else None
+
+    @property
+    def distance_covered(self):
+        ''' Total distance the robot has travelled. '''
+        return float(self.multi_robot_manager.distance_covered[self.robot_id])
+
+    @property
+    def visited_nodes(self):
+        ''' Bitset of node ids visited by the robot or shared with it, or None if the strategy does not track them. '''
+        manager = self.multi_robot_manager
+        if manager.visited_nodes is None:
+            return None
+        return manager.visited_nodes[manager.knowledge_rows[self.robot_id]]
+
+    @property
+    def visited_edges(self):
+        ''' Bitset of edge ids traversed by the robot or shared with it, or None if the strategy does not track them. '''
+        manager = self.multi_robot_manager
+        if manager.visited_edges is None:
+            return None
+        return manager.visited_edges[manager.knowledge_rows[self.robot_id]]
+
+    def move(self, next_position, distance, edge_id):
         ''' Updates the robot's position, distance covered, and time elapsed. '''
-        self.last_position = self.position
-        self.position = next_position
-        self.distance_covered += distance
-        self.visited_nodes.add(next_position)
-        self.visited_edges.add((self.last_position, next_position))
+        self.multi_robot_manager.move_robot(self.robot_id, next_position, distance, edge_id)
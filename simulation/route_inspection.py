@@ -0,0 +1,170 @@
+import json
+import os
+import networkx as nx
+import numpy as np
+from scipy.sparse.csgraph import connected_components, dijkstra
+from network import Network, network_graph
+from network_cache import DEFAULT_CACHE_DIR, network_key
+
+# Exact matching takes time cubic in the number of odd-degree nodes: about 8 s at 212 (balerma) and 216
+# (marchi_rural), and about 25 s at this limit. Networks with more are matched greedily
+EXACT_MATCHING_MAX_ODD_NODES = 300
+
+# Bumped whenever a change to the matching changes the bounds, so stale cached bounds are not reused
+ROUTE_INSPECTION_FORMAT_VERSION = 1
+
+# Results that do not depend on the number of robots, and so can be cached per network
+CACHED_RESULTS = ('total_length', 'lower_bound', 'walk_length', 'odd_nodes', 'matching_length', 'exact')
+
+def voronoi_pairs(graph, network, sources):
+    ''' Finds candidate pairs of sources that meet across the boundary of their shortest-path regions.
+
+    One multi-source Dijkstra assigns every node to its nearest source. Each edge joining two regions gives a
+    real path between their sources, and the cheapest such edge per pair of regions is kept. The cheapest pair
+    of every source is exactly its nearest other source, so no source-to-source Dijkstra is ever run.
+    '''
+    distances, predecessors, nearest = dijkstra(graph, indices=sources, min_only=True, return_predecessors=True)
+    u, v = network.edge_endpoints[:, 0], network.edge_endpoints[:, 1]
+    boundary = np.nonzero(nearest[u] != nearest[v])[0]
+    weights = distances[u[boundary]] + network.edge_lengths[boundary] + distances[v[boundary]]
+    low = np.minimum(nearest[u[boundary]], nearest[v[boundary]])
+    high = np.maximum(nearest[u[boundary]], nearest[v[boundary]])
+
+    order = np.lexsort((weights, high, low))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (low[order][1:] != low[order][:-1]) | (high[order][1:] != high[order][:-1])
+    keep = order[first]
+    return {
+        'low': low[keep], 'high': high[keep], 'weights': weights[keep], 'edges': boundary[keep],
+        'predecessors': predecessors,
+    }
+
+def path_to_source(predecessors, node):
+    ''' Follows Dijkstra predecessors from a node back to its source, returning the nodes passed. '''
+    path = [node]
+    while predecessors[path[-1]] >= 0:
+        path.append(predecessors[path[-1]])
+    return path
+
+def match_odd_nodes_exactly(graph, odd_nodes):
+    ''' Pairs up odd-degree nodes by a minimum weight perfect matching over their shortest-path distances.
+
+    Returns the matched paths and their total length, which is then the exact extra length of the shortest
+    closed walk. One Dijkstra per odd node gives the complete graph the matching is solved on.
+    '''
+    distances, predecessors = dijkstra(graph, indices=odd_nodes, return_predecessors=True)
+    G = nx.Graph()
+    for i in range(len(odd_nodes)):
+        G.add_weighted_edges_from((i, j, distances[i, odd_nodes[j]]) for j in range(i + 1, len(odd_nodes)))
+    paths = []
+    for i, j in nx.min_weight_matching(G):
+        path = path_to_source(predecessors[i], odd_nodes[j])
+        paths.append((path, distances[i, odd_nodes[j]]))
+    return paths, float(sum(weight for _, weight in paths))
+
+def match_odd_nodes(graph, network, odd_nodes):
+    ''' Pairs up odd-degree nodes greedily along Voronoi candidate paths, returning the matched paths and bound. '''
+    nearest_other = None
+    paths = []
+    unmatched = np.asarray(odd_nodes)
+    while len(unmatched):
+        pairs = voronoi_pairs(graph, network, unmatched)
+        if nearest_other is None:
+            # Every matched pair costs at least half of each endpoint's distance to its nearest other odd node
+            nearest_other = np.full(network.number_of_nodes, np.inf)
+            np.minimum.at(nearest_other, pairs['low'], pairs['weights'])
+            np.minimum.at(nearest_other, pairs['high'], pairs['weights'])
+            lower_bound = 0.5 * nearest_other[unmatched].sum()
+
+        matched = np.zeros(network.number_of_nodes, dtype=bool)
+        for i in np.argsort(pairs['weights'], kind='stable').tolist():
+            low, high = pairs['low'][i], pairs['high'][i]
+            if matched[low] or matched[high]:
+                continue
+            matched[low] = matched[high] = True
+            u, v = network.edge_endpoints[pairs['edges'][i]].tolist()
+            path = path_to_source(pairs['predecessors'], u)[::-1] + path_to_source(pairs['predecessors'], v)
+            paths.append((path, pairs['weights'][i]))
+        # Leftover nodes had all their neighbouring regions taken, so they are paired again among themselves
+        unmatched = unmatched[~matched[unmatched]]
+    return paths, (lower_bound if nearest_other is not None else 0.0)
+
+def closed_walk(network, paths, start):
+    ''' Builds an Eulerian closed walk over every edge plus the duplicated matching paths. '''
+    G = nx.MultiGraph()
+    G.add_nodes_from(range(network.number_of_nodes))
+    G.add_edges_from(network.edge_endpoints.tolist())
+    for path, _ in paths:
+        G.add_edges_from(zip(path[:-1], path[1:]))
+    walk = [start] + [v for _, v in nx.eulerian_circuit(G, source=start)]
+    return walk
+
+def split_walk(walk, edge_length, depot_distances, number_of_robots):
+    ''' Splits a closed walk into contiguous segments, one per robot, that each robot reaches from the depot. '''
+    step_lengths = np.array([edge_length[min(a, b), max(a, b)] for a, b in zip(walk[:-1], walk[1:])])
+    cumulative = np.concatenate([[0.0], np.cumsum(step_lengths)])
+    bounds = np.searchsorted(cumulative, np.linspace(0, cumulative[-1], number_of_robots + 1))
+    bounds[-1] = len(walk) - 1
+    robot_distances = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        segment = cumulative[end] - cumulative[start]
+        robot_distances.append(depot_distances[walk[start]] + segment if end > start else 0.0)
+    return robot_distances
+
+def route_inspection(network, number_of_robots=1, start=0, exact_limit=EXACT_MATCHING_MAX_ODD_NODES):
+    ''' Computes the route inspection (Chinese postman) lower bound, a feasible closed walk and its k-robot split.
+
+    Networks with at most exact_limit odd-degree nodes are matched exactly, so the bound and the walk are both
+    the optimum. Larger ones are matched greedily, with a bound from each odd node's nearest other odd node.
+    '''
+    graph = network_graph(network)
+    if connected_components(graph, directed=False)[0] > 1:
+        raise ValueError('Route inspection needs a connected network')
+
+    degrees = np.diff(network.offsets)
+    odd_nodes = np.nonzero(degrees % 2)[0]
+    exact = len(odd_nodes) <= exact_limit
+    if exact:
+        paths, matching_bound = match_odd_nodes_exactly(graph, odd_nodes)
+    else:
+        paths, matching_bound = match_odd_nodes(graph, network, odd_nodes)
+    matching_length = float(sum(weight for _, weight in paths))
+    walk = closed_walk(network, paths, start)
+
+    edge_length = dict(zip(map(tuple, network.edge_endpoints.tolist()), network.edge_lengths.tolist()))
+    depot_distances = dijkstra(graph, indices=start)
+    robot_distances = split_walk(walk, edge_length, depot_distances, number_of_robots)
+    total_length = float(network.edge_lengths.sum())
+    return {
+        'total_length': total_length,
+        'lower_bound': total_length + matching_bound,
+        'walk_length': total_length + matching_length,
+        'walk': walk,
+        'odd_nodes': len(odd_nodes),
+        'matching_length': matching_length,
+        'exact': exact,
+        'robot_distances': robot_distances,
+        'split_length': sum(robot_distances),
+    }
+
+def cached_route_inspection(network_file, exact_limit=EXACT_MATCHING_MAX_ODD_NODES, cache_dir=DEFAULT_CACHE_DIR):
+    ''' Returns the bound, closed walk length and matching of a network, cached next to its compiled arrays.
+
+    Entries are keyed by the INP file's content hash, so only the first call for a network solves the matching.
+    '''
+    path = os.path.join(
+        cache_dir, f"{network_key(network_file)}.route_inspection.v{ROUTE_INSPECTION_FORMAT_VERSION}.{exact_limit}.json"
+    )
+    try:
+        with open(path) as result_file:
+            return json.load(result_file)
+    except (OSError, ValueError):
+        pass
+    result = route_inspection(Network(network_file, cache_dir), exact_limit=exact_limit)
+    result = {name: result[name] for name in CACHED_RESULTS}
+    os.makedirs(cache_dir, exist_ok=True)
+    # Written to a temporary file first, so readers never see part of it
+    with open(path + '.tmp', 'w') as result_file:
+        json.dump(result, result_file)
+    os.replace(path + '.tmp', path)
+    return result
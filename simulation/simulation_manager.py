@@ -1,85 +1,128 @@
-import pygame
+import random
+import numpy as np
 from network import Network
 from inspection_strategy import MultiRobotManager, RandomWalkStrategy, AntColonyOptimisation
 
 class SimulationManager:
     ''' Manages the simulation; initializes the network, robots, and inspection strategy. '''
-    def __init__(self, network_file, number_of_robots=1, strategy=RandomWalkStrategy):
-        ''' Simulation manager object constructor. '''
+    def __init__(self, network_file, number_of_robots=1, strategy=RandomWalkStrategy, max_ticks=None,
+                 strategy_options=None, seed=None, profiler=None):
+        ''' Simulation manager object constructor; an optional Profiler instruments the run. '''
+        # Arguments that rebuild this simulation when it is resumed from a checkpoint
+        self.config = {
+            'network_file': network_file, 'number_of_robots': number_of_robots, 'strategy': strategy,
+            'max_ticks': max_ticks, 'strategy_options': strategy_options, 'seed': seed,
+        }
         self.network = Network(network_file)
-        start_position = list(self.network.G.nodes())[0]
+        start_position = 0
         initial_positions = [start_position for _ in range(number_of_robots)]
-        self.multi_robot_manager = MultiRobotManager(number_of_robots, initial_positions)
-        self.strategy = strategy(self.network)
-        self.setup_pygame()
-        self.network.scale_network(self.window_width, self.window_height, 50)
-        self.all_robots_stopped = False
-        self.visited_nodes = set([start_position])
+        self.multi_robot_manager = MultiRobotManager(
+            number_of_robots, initial_positions, self.network.number_of_nodes, self.network.number_of_edges,
+            track_visited=strategy.tracks_visited,
+        )
+        # All randomness in a run comes from this generator, so a seed makes the run reproducible
+        self.rng = random.Random(seed)
+        self.strategy = strategy(self.network, rng=self.rng, **(strategy_options or {}))
+        # Swarm-level coverage bitmap over node ids
+        self.covered_nodes = np.zeros(self.network.number_of_nodes, dtype=bool)
+        self.covered_nodes[start_position] = True
+        self.covered_count = 1
+        self.covered_edges = np.zeros(self.network.number_of_edges, dtype=bool)
+        self.max_ticks = max_ticks
+        self.tick = 0
+        self.observers = []
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.attach(self)
 
-    def setup_pygame(self):
-        ''' Sets up the pygame window and colors. '''
-        pygame.init()
-        self.window_width, self.window_height = 1200, 800
-        self.screen = pygame.display.set_mode((self.window_width, self.window_height))
-        self.colors = {
-            'background': (211, 211, 211),
-            'network_line': (0, 0, 128),
-            'node': (0, 128, 128),
-            'robot': (255, 127, 80),
-        }
+    def add_observer(self, observer, every=1):
+        ''' Attaches an observer (e.g. a renderer) that is notified every given number of ticks. '''
+        self.observers.append((observer, every))
 
     def run(self):
-        ''' Runs simulation until network has been fully covered. '''
-        while len(self.visited_nodes) != len(self.network.G.nodes):
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    return
+        ''' Runs simulation until network has been fully covered, the tick limit is hit or an observer stops it. '''
+        for observer, _ in self.observers:
+            observer.on_start(self)
 
-            self.screen.fill(self.colors['background'])
-            self.draw_network()
+        while not self.is_finished():
+            if self.max_ticks is not None and self.tick >= self.max_ticks:
+                break
+            self.step()
+            if not self.notify_observers():
+                break
 
-            for robot in self.multi_robot_manager.robots:
-                next_position, distance = self.strategy.next_move(robot, self.multi_robot_manager.robots, self.network)
-                robot.move(next_position, distance)
-                self.visited_nodes.add(next_position)
-                
-                if hasattr(self.strategy, 'reinforce_pheromone'):
-                    self.strategy.reinforce_pheromone((robot.last_position, next_position))
+        for observer, _ in self.observers:
+            observer.on_finish(self)
 
-                robot_pos = self.network.G.nodes[robot.position]['pos']
-                pygame.draw.circle(self.screen, self.colors['robot'], robot_pos, 5)
+    def step(self):
+        ''' Advances the simulation by one tick, moving every robot once. '''
+        manager = self.multi_robot_manager
+        if self.strategy.moves_in_batches:
+            robot_ids = np.arange(len(manager.robots))
+            next_positions, distances, edge_ids = self.strategy.next_moves(manager, robot_ids)
+            manager.move_robots(robot_ids, next_positions, distances, edge_ids)
+            moving = edge_ids >= 0
+            self.mark_covered(next_positions[moving], edge_ids[moving])
+        else:
+            # Robots move one after another, so later robots see the earlier moves of the tick
+            for robot in manager.robots:
+                next_position, distance, edge_id = self.strategy.next_move(robot, manager.robots, self.network)
+                if next_position is None:
+                    continue
+                robot.move(next_position, distance, edge_id)
+                self.covered_edges[edge_id] = True
+                if not self.covered_nodes[next_position]:
+                    self.covered_nodes[next_position] = True
+                    self.covered_count += 1
+        self.strategy.update(manager)
+        self.tick += 1
 
-            pygame.display.flip()
+    def mark_covered(self, nodes, edge_ids):
+        ''' Adds a batch of reached nodes and traversed edges to the swarm's coverage. '''
+        self.covered_edges[edge_ids] = True
+        new_nodes = np.unique(nodes[~self.covered_nodes[nodes]])
+        self.covered_nodes[new_nodes] = True
+        self.covered_count += len(new_nodes)
+
+    def get_state(self):
+        ''' Returns a copy of everything that changes during a run, for checkpoints. '''
+        return {
+            'tick': self.tick,
+            'rng': self.rng.getstate(),
+            'covered_nodes': self.covered_nodes.copy(),
+            'covered_count': self.covered_count,
+            'covered_edges': self.covered_edges.copy(),
+            'robots': self.multi_robot_manager.get_state(),
+            'strategy': self.strategy.get_state(),
+        }
 
+    def set_state(self, state):
+        ''' Restores state returned by get_state, so the run continues exactly as it would have. '''
+        self.tick = state['tick']
+        # Set in place, since the strategy shares this generator
+        self.rng.setstate(state['rng'])
+        self.covered_nodes[:] = state['covered_nodes']
+        self.covered_count = state['covered_count']
+        self.covered_edges[:] = state['covered_edges']
+        self.multi_robot_manager.set_state(state['robots'])
+        self.strategy.set_state(state['strategy'])
 
-    def draw_network(self):
-        ''' Draws the water distribution network and nodes on the screen. '''
-        for edge in self.network.G.edges():
-            start_pos = self.network.G.nodes[edge[0]]['pos']
-            end_pos = self.network.G.nodes[edge[1]]['pos']
-            pygame.draw.line(self.screen, self.colors['network_line'], start_pos, end_pos, 1)
-        for node in self.network.G.nodes():
-            node_pos = self.network.G.nodes[node]['pos']
-            pygame.draw.circle(self.screen, self.colors['node'], node_pos, 2)
+    def notify_observers(self):
+        ''' Notifies observers that are due this tick, returning False if any of them asks to stop. '''
+        keep_running = True
+        for observer, every in self.observers:
+            if self.tick % every == 0 and observer.on_tick(self) is False:
+                keep_running = False
+        return keep_running
 
-    def move_robots(self):
-        ''' Moves each robot based on the selected inspection strategy (if they are still active) and draws them. '''
-        all_inactive = 1
-        for robot in self.multi_robot_manager.robots:
-            if robot.active:
-                new_position, distance = self.strategy.next_move(robot, self.multi_robot_manager.robots, self.network)
-                if new_position is not None:
-                    all_inactive = 0
-                    robot.move(new_position, distance)
-                    self.visited_nodes.add(new_position)
-                else:
-                    robot.deactivate()
+    def is_finished(self):
+        ''' Returns whether the simulation has nothing left to do. Overridden by other engines. '''
+        return self.is_covered()
 
-            robot_pos = self.network.G.nodes[robot.position]['pos']
-            pygame.draw.circle(self.screen, self.colors['robot'], robot_pos, 5)
-        return all_inactive
+    def is_covered(self):
+        ''' Returns whether every node in the network has been visited. '''
+        return self.covered_count == self.network.number_of_nodes
 
     def get_number_of_nodes(self):
         ''' Returns number of nodes in the network. '''
-        return len(self.network.G.nodes)
\ No newline at end of file
+        return self.network.number_of_nodes
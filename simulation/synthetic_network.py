@@ -0,0 +1,69 @@
+import argparse
+import os
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import minimum_spanning_tree
+
+def generate_city_network(width, height, block_length=100.0, loop_fraction=0.3, jitter=0.2, seed=0):
+    ''' Generates a city-like pipe network on a jittered street grid, returned as nodes, coordinates and pipes.
+
+    A random spanning tree of the grid keeps every junction connected, and a fraction of the remaining street
+    segments is added back to give the loops real distribution networks have. Pipe lengths are the distances
+    between their junctions.
+    '''
+    rng = np.random.default_rng(seed)
+    number_of_nodes = width * height
+    columns, rows = np.meshgrid(np.arange(width), np.arange(height))
+    coordinates = np.stack([columns.ravel(), rows.ravel()], axis=1) * block_length
+    coordinates = coordinates + rng.uniform(-jitter, jitter, coordinates.shape) * block_length
+
+    nodes = np.arange(number_of_nodes).reshape(height, width)
+    starts = np.concatenate([nodes[:, :-1].ravel(), nodes[:-1, :].ravel()])
+    ends = np.concatenate([nodes[:, 1:].ravel(), nodes[1:, :].ravel()])
+    # A minimum spanning tree over random weights is a random spanning tree
+    weights = rng.uniform(1.0, 2.0, len(starts))
+    tree = minimum_spanning_tree(coo_matrix((weights, (starts, ends)), shape=(number_of_nodes, number_of_nodes))).tocoo()
+    tree_keys = np.minimum(tree.row, tree.col).astype(np.int64) * number_of_nodes + np.maximum(tree.row, tree.col)
+    keys = starts.astype(np.int64) * number_of_nodes + ends
+    keep = np.isin(keys, tree_keys) | (rng.random(len(keys)) < loop_fraction)
+
+    starts, ends = starts[keep], ends[keep]
+    lengths = np.linalg.norm(coordinates[starts] - coordinates[ends], axis=1)
+    return {'coordinates': coordinates, 'link_starts': starts, 'link_ends': ends, 'link_lengths': lengths}
+
+def write_inp(network, path, title='Synthetic city network'):
+    ''' Writes a generated network as an INP file in SI units, with node 0 as a reservoir feeding the rest. '''
+    coordinates = network['coordinates']
+    with open(path, 'w') as inp_file:
+        inp_file.write(f"[TITLE]\n{title}\n\n[OPTIONS]\nUnits LPS\n\n")
+        inp_file.write("[RESERVOIRS]\nR0 100\n\n[JUNCTIONS]\n")
+        inp_file.writelines(f"J{node} 0 0\n" for node in range(1, len(coordinates)))
+        inp_file.write("\n[PIPES]\n")
+        names = ['R0'] + [f"J{node}" for node in range(1, len(coordinates))]
+        inp_file.writelines(
+            f"P{i} {names[start]} {names[end]} {length:.2f} 300 100 0\n"
+            for i, (start, end, length) in enumerate(zip(
+                network['link_starts'].tolist(), network['link_ends'].tolist(), network['link_lengths'].tolist()))
+        )
+        inp_file.write("\n[COORDINATES]\n")
+        inp_file.writelines(f"{name} {x:.2f} {y:.2f}\n" for name, (x, y) in zip(names, coordinates.tolist()))
+        inp_file.write("\n[END]\n")
+
+def main():
+    ''' Generates a synthetic city network INP file. '''
+    parser = argparse.ArgumentParser(description='Generates a synthetic city-scale pipe network.')
+    parser.add_argument('--width', type=int, default=300, help='junctions per street grid row')
+    parser.add_argument('--height', type=int, default=300, help='junctions per street grid column')
+    parser.add_argument('--loop-fraction', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    output = args.output or f"../networks/synthetic/city_{args.width}x{args.height}_{args.seed}.inp"
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    network = generate_city_network(args.width, args.height, loop_fraction=args.loop_fraction, seed=args.seed)
+    write_inp(network, output)
+    print(f"Wrote {output}: {len(network['coordinates'])} nodes, {len(network['link_starts'])} pipes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import json
+import os
+from types import SimpleNamespace
+import numpy as np
+from network import Network
+from network_cache import network_key
+
+HEADER_FILE = 'header.json'
+POSITIONS_FILE = 'positions.bin'
+PHEROMONES_FILE = 'pheromones.bin'
+
+# Records are read this many at a time by the analyses, so memory stays bounded however long the run
+CHUNK_RECORDS = 4096
+
+def position_dtype(number_of_robots):
+    ''' Returns the fixed-width record of one recorded tick: its tick, clock time and every robot's node id. '''
+    return np.dtype([('tick', '<i8'), ('time', '<f8'), ('positions', '<i4', (number_of_robots,))])
+
+def pheromone_dtype(number_of_edges):
+    ''' Returns the fixed-width record of one pheromone snapshot: its tick and the level of every edge. '''
+    return np.dtype([('tick', '<i8'), ('pheromones', '<f4', (number_of_edges,))])
+
+def map_records(path, dtype):
+    ''' Memory-maps the complete records of an append-only log, ignoring a partly written last record. '''
+    count = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+class TrajectoryRecorder:
+    ''' Observer that appends a run's robot positions, and optionally pheromone snapshots, to a trajectory log.
+
+    The log is a directory holding a JSON header and append-only binary files of fixed-width records, so it can
+    be memory-mapped and seeked by tick without parsing. Each record is one tick's node id per robot, written
+    straight from the position array. Strategies with pheromones also get a snapshot of every edge's level
+    every given number of ticks. On the event engine positions are the node each robot is heading to.
+    '''
+    def __init__(self, path, pheromone_every=None):
+        ''' Trajectory recorder object constructor; the log directory is created when the simulation starts. '''
+        self.path = path
+        self.pheromone_every = pheromone_every
+
+    def on_start(self, simulation):
+        ''' Writes the header and the starting positions. '''
+        os.makedirs(self.path, exist_ok=True)
+        network = simulation.network
+        manager = simulation.multi_robot_manager
+        header = {
+            'network_file': os.path.abspath(network.network_file),
+            'network_key': network_key(network.network_file),
+            'strategy': type(simulation.strategy).__name__,
+            'number_of_robots': len(manager.positions),
+            'number_of_nodes': network.number_of_nodes,
+            'number_of_edges': network.number_of_edges,
+        }
+        with open(os.path.join(self.path, HEADER_FILE), 'w') as header_file:
+            json.dump(header, header_file, indent=2)
+
+        self.record = np.zeros(1, dtype=position_dtype(len(manager.positions)))
+        self.positions_file = open(os.path.join(self.path, POSITIONS_FILE), 'wb')
+        self.snapshot = None
+        if self.pheromone_every and hasattr(simulation.strategy, 'get_pheromones'):
+            self.snapshot = np.zeros(1, dtype=pheromone_dtype(network.number_of_edges))
+            self.all_edges = np.arange(network.number_of_edges)
+            self.pheromones_file = open(os.path.join(self.path, PHEROMONES_FILE), 'wb')
+        self.last_tick = None
+        self.on_tick(simulation)
+
+    def on_tick(self, simulation):
+        ''' Appends the current positions, and a pheromone snapshot when one is due. '''
+        record = self.record
+        record['tick'] = simulation.tick
+        record['time'] = getattr(simulation, 'time', simulation.tick)
+        record['positions'] = simulation.multi_robot_manager.positions
+        self.positions_file.write(record.tobytes())
+        self.last_tick = simulation.tick
+
+        if self.snapshot is not None and simulation.tick % self.pheromone_every == 0:
+            self.snapshot['tick'] = simulation.tick
+            self.snapshot['pheromones'] = simulation.strategy.get_pheromones(self.all_edges)
+            self.pheromones_file.write(self.snapshot.tobytes())
+
+    def on_finish(self, simulation):
+        ''' Appends the final positions if they were not the last recorded ones and closes the log. '''
+        if simulation.tick != self.last_tick:
+            self.on_tick(simulation)
+        self.positions_file.close()
+        if self.snapshot is not None:
+            self.pheromones_file.close()
+
+class Trajectory:
+    ''' A recorded trajectory log, memory-mapped for seeking and analysis without re-running the simulation. '''
+    def __init__(self, path):
+        ''' Opens a trajectory log and the network it was recorded on, which must not have changed since. '''
+        with open(os.path.join(path, HEADER_FILE)) as header_file:
+            self.header = json.load(header_file)
+        if network_key(self.header['network_file']) != self.header['network_key']:
+            raise ValueError(f"{self.header['network_file']} has changed since the trajectory was recorded")
+        self.network = Network(self.header['network_file'])
+        self.records = map_records(os.path.join(path, POSITIONS_FILE), position_dtype(self.header['number_of_robots']))
+        self.snapshots = map_records(os.path.join(path, PHEROMONES_FILE), pheromone_dtype(self.header['number_of_edges']))
+        self.ticks = np.asarray(self.records['tick'])
+        # Sorted (low, high) keys of the network's edges, to find the edge between two consecutive positions
+        endpoints = self.network.edge_endpoints
+        self.edge_keys = endpoints[:, 0] * self.network.number_of_nodes + endpoints[:, 1]
+
+    def __len__(self):
+        ''' Returns the number of recorded ticks. '''
+        return len(self.records)
+
+    def index_at(self, tick):
+        ''' Returns the index of the last record at or before a tick. '''
+        return max(int(np.searchsorted(self.ticks, tick, side='right')) - 1, 0)
+
+    def positions_at(self, tick):
+        ''' Returns every robot's node id at a tick. '''
+        return np.asarray(self.records['positions'][self.index_at(tick)])
+
+    def pheromones_at(self, tick):
+        ''' Returns the most recent pheromone snapshot at or before a tick, or None if there is none. '''
+        index = int(np.searchsorted(self.snapshots['tick'], tick, side='right')) - 1
+        return np.asarray(self.snapshots['pheromones'][index]) if index >= 0 else None
+
+    def chunks(self, start=0, stop=None):
+        ''' Yields the record index and positions of consecutive blocks of records, overlapping by one record. '''
+        stop = len(self) if stop is None else stop
+        for chunk_start in range(start, stop, CHUNK_RECORDS):
+            chunk_stop = min(chunk_start + CHUNK_RECORDS + 1, stop)
+            yield chunk_start, np.asarray(self.records['positions'][chunk_start:chunk_stop])
+
+    def traversed_edges(self, previous_positions, positions):
+        ''' Returns the edge id each robot traversed between two records, or -1 where it did not move along one. '''
+        low = np.minimum(previous_positions, positions).astype(np.int64)
+        high = np.maximum(previous_positions, positions).astype(np.int64)
+        keys = low * self.network.number_of_nodes + high
+        found = np.minimum(np.searchsorted(self.edge_keys, keys), len(self.edge_keys) - 1)
+        # Records further apart than one move do not always join adjacent nodes
+        is_edge = (low != high) & (self.edge_keys[found] == keys)
+        return np.where(is_edge, found, -1)
+
+    def first_visits(self):
+        ''' Returns the first recorded tick every node was occupied at, or -1 for nodes never reached. '''
+        never = np.iinfo(np.int64).max
+        first = np.full(self.network.number_of_nodes, never, dtype=np.int64)
+        for chunk_start, positions in self.chunks():
+            ticks = np.repeat(self.ticks[chunk_start:chunk_start + len(positions)], positions.shape[1])
+            np.minimum.at(first, positions.ravel(), ticks)
+        first[first == never] = -1
+        return first
+
+    def coverage_curve(self):
+        ''' Returns the recorded ticks and the number of nodes covered by each of them. '''
+        first = self.first_visits()
+        reached = np.sort(first[first >= 0])
+        return self.ticks, np.searchsorted(reached, self.ticks, side='right')
+
+    def node_occupancy(self):
+        ''' Returns how many robot-records were spent at each node. '''
+        counts = np.zeros(self.network.number_of_nodes, dtype=np.int64)
+        for _, positions in self.chunks():
+            # Chunks overlap by one record, which is only counted in the chunk it starts
+            counts += np.bincount(positions[:CHUNK_RECORDS].ravel(), minlength=self.network.number_of_nodes)
+        return counts
+
+    def edge_traversals(self, stop=None):
+        ''' Returns how many times each edge was traversed by any robot, up to a record index. '''
+        counts = np.zeros(self.network.number_of_edges, dtype=np.int64)
+        for _, positions in self.chunks(stop=stop):
+            edges = self.traversed_edges(positions[:-1], positions[1:]).ravel()
+            counts += np.bincount(edges[edges >= 0], minlength=self.network.number_of_edges)
+        return counts
+
+    def play(self, observer, start_tick=0):
+        ''' Replays the recorded positions and coverage through an observer, such as the pygame renderer. '''
+        start = self.index_at(start_tick)
+        view = ReplayView(self)
+        first = self.first_visits()
+        view.covered_nodes[:] = (first >= 0) & (first <= self.ticks[start])
+        view.covered_edges[:] = self.edge_traversals(stop=start + 1) > 0
+        view.multi_robot_manager.positions = self.positions_at(self.ticks[start])
+        view.tick = int(self.ticks[start])
+        observer.on_start(view)
+        for chunk_start, positions in self.chunks(start):
+            edges = self.traversed_edges(positions[:-1], positions[1:])
+            for offset in range(1, len(positions)):
+                moved = edges[offset - 1]
+                view.covered_edges[moved[moved >= 0]] = True
+                view.covered_nodes[positions[offset]] = True
+                view.multi_robot_manager.positions = positions[offset]
+                view.tick = int(self.ticks[chunk_start + offset])
+                if observer.on_tick(view) is False:
+                    observer.on_finish(view)
+                    return
+        observer.on_finish(view)
+
+class ReplayView:
+    ''' Stands in for a simulation while a trajectory is replayed, with the state observers read from one. '''
+    def __init__(self, trajectory):
+        ''' Replay view object constructor. '''
+        self.network = trajectory.network
+        self.tick = 0
+        self.covered_nodes = np.zeros(self.network.number_of_nodes, dtype=bool)
+        self.covered_edges = np.zeros(self.network.number_of_edges, dtype=bool)
+        self.multi_robot_manager = SimpleNamespace(positions=None)